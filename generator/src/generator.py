@@ -1,22 +1,31 @@
+import hashlib
+import json
 import logging
 from typing import Dict, Any, List, Tuple, Optional
 from pathlib import Path
 from jinja2 import Environment, FileSystemLoader, BaseLoader, Template
 import markdown
 from datetime import datetime, timedelta
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, OrderedDict
 from io import BytesIO
 
 logger = logging.getLogger(__name__)
 
+# Most recent renders kept when cache_renders is on; older entries are evicted first
+RENDER_CACHE_SIZE = 32
+
 class DocumentGenerator:
     """Generate network documentation from parsed Visio data."""
     
-    def __init__(self, template_dir: Path):
+    def __init__(self, template_dir: Path, cache_renders: bool = False):
         self.template_dir = template_dir
         self.env = Environment(loader=FileSystemLoader(template_dir))
         self.professional_mode = True  # Default to professional templates
         
+        # Optional render cache, keyed on a digest of the diagram content and the format
+        self.cache_renders = cache_renders
+        self._render_cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        
         # Add custom filters for templates
         self.env.filters['date_add_months'] = self._date_add_months
         
@@ -37,6 +46,35 @@ class DocumentGenerator:
         """
         logger.info(f"Generating {output_format} documentation with customization")
         
+        # Only plain renders are cached; any customization argument bypasses the cache
+        cacheable = self.cache_renders and not (ai_analysis or supplemental_data or template_config or organization_config)
+        if cacheable:
+            cache_key = (self._content_digest(diagram_data), output_format)
+            cached_content = self._render_cache.get(cache_key)
+            if cached_content is not None:
+                self._render_cache.move_to_end(cache_key)
+                return cached_content
+        
+        content = self._render_documentation(diagram_data, output_format, ai_analysis, supplemental_data, template_config, organization_config)
+        
+        if cacheable:
+            self._render_cache[cache_key] = content
+            # Rendering annotates the input shapes in place (connections_count), so also file
+            # the output under the digest of the data as the caller now holds it
+            self._render_cache[(self._content_digest(diagram_data), output_format)] = content
+            while len(self._render_cache) > RENDER_CACHE_SIZE:
+                self._render_cache.popitem(last=False)
+        
+        return content
+    
+    @staticmethod
+    def _content_digest(diagram_data: Dict[str, Any]) -> str:
+        """Stable digest of the diagram content; equal data gives the same key, whatever the object."""
+        content = json.dumps(diagram_data, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode()).hexdigest()
+    
+    def _render_documentation(self, diagram_data: Dict[str, Any], output_format: str, ai_analysis: Dict[str, Any], supplemental_data: Dict[str, Any], template_config: Dict[str, Any], organization_config: Dict[str, Any]) -> bytes:
+        """Process the diagram data and render it in the requested format."""
         # Process and enhance the diagram data
         enhanced_data = self._process_diagram_data(diagram_data)
         
@@ -394,7 +432,7 @@ class DocumentGenerator:
             render_data['css_styles'] = css_styles
             render_data['header_template'] = header_template
             render_data['footer_template'] = footer_template
-            render_data['generated_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            render_data.setdefault('generated_date', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
             
             # Add organization data if available
             if 'organization' in render_data:
@@ -428,10 +466,10 @@ class DocumentGenerator:
             # Remove 'title' from data if it exists to avoid duplicate keyword argument
             render_data = data.copy()
             title = render_data.pop('title', 'Network Documentation')
+            render_data.setdefault('generated_date', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
             
             html_content = template.render(
                 title=title,
-                generated_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 diagram_data=data,
                 **render_data  # Pass all enhanced data except title
             )
@@ -624,10 +662,10 @@ class DocumentGenerator:
         # Remove 'title' from data if it exists to avoid duplicate keyword argument
         render_data = data.copy()
         title = render_data.pop('title', 'Network Documentation')
+        render_data.setdefault('generated_date', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         
         md_content = template.render(
             title=title,
-            generated_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             diagram_data=data,
             **render_data  # Pass all enhanced data except title
         )
@@ -207,6 +207,7 @@ class GeneratorService:
     async def shutdown(self):
         """Shutdown the service gracefully."""
         await self.mq.disconnect()
+        await self.storage.close()
 
 async def main():
     """Main entry point."""
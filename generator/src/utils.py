@@ -1,7 +1,12 @@
 import os
+import re
 from pathlib import Path
 from typing import Dict, Any, List
 
+# Strict IPv4 pattern compiled once; octet ranges are validated by the regex itself
+_OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+_IP_RE = re.compile(rf"\b(?:{_OCTET}\.){{3}}{_OCTET}\b")
+
 def create_table_of_contents(sections: List[Dict[str, Any]]) -> str:
     """
     Create a table of contents from document sections.
@@ -58,4 +63,61 @@ def sanitize_filename(filename: str) -> str:
     invalid_chars = '<>:"/\\|?*'
     for char in invalid_chars:
         filename = filename.replace(char, '_')
-    return filename
\ No newline at end of file
+    return filename
+
+def extract_ip_addresses(text: str) -> List[str]:
+    """
+    Extract valid IPv4 addresses from free text.
+    
+    Args:
+        text: Text to scan for IP addresses
+        
+    Returns:
+        List of IP addresses in order of appearance
+    """
+    return _IP_RE.findall(text)
+
+def format_bytes(size: int) -> str:
+    """
+    Format a byte count as a human-readable size.
+    
+    Args:
+        size: Size in bytes
+        
+    Returns:
+        Size such as '512 B' or '1.46 KB'
+    """
+    if size < 1024:
+        return f"{size} B"
+    
+    value = float(size)
+    for unit in ("KB", "MB", "GB", "TB"):
+        value /= 1024
+        if value < 1024 or unit == "TB":
+            return f"{value:.2f} {unit}"
+
+# Device categories counted by categorize_devices, keyed by shape type
+_DEVICE_CATEGORIES = {
+    "router": "routers",
+    "switch": "switches",
+    "server": "servers",
+    "firewall": "firewalls",
+}
+
+def categorize_devices(devices: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Count devices per category.
+    
+    Args:
+        devices: List of device dictionaries with a 'shape_type' key
+        
+    Returns:
+        Device count per category; unrecognized types are counted as 'other'
+    """
+    categories = dict.fromkeys(_DEVICE_CATEGORIES.values(), 0)
+    categories["other"] = 0
+    
+    for device in devices:
+        categories[_DEVICE_CATEGORIES.get(device.get("shape_type"), "other")] += 1
+    
+    return categories
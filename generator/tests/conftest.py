@@ -0,0 +1,21 @@
+import pytest
+from pathlib import Path
+
+# Add parent directory to path
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.generator import DocumentGenerator
+
+TEMPLATE_DIR = Path(__file__).parent.parent / "src" / "templates"
+
+@pytest.fixture(scope="session")
+def generator():
+    """Create a DocumentGenerator instance shared across the test session."""
+    return DocumentGenerator(TEMPLATE_DIR)
+
+@pytest.fixture(scope="session", autouse=True)
+def prewarm_templates(generator):
+    """Compile every bundled template once so no test pays the first-load cost."""
+    for template_name in generator.env.list_templates():
+        generator.env.get_template(template_name)
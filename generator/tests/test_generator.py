@@ -2,6 +2,7 @@ import pytest
 from pathlib import Path
 import json
 import tempfile
+import types
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime
 
@@ -13,15 +14,30 @@ from src.generator import DocumentGenerator
 from src.utils import format_bytes, extract_ip_addresses, categorize_devices
 
 
+def _mock_save(buffer):
+    """Write fake DOCX bytes into the buffer passed to Document.save."""
+    buffer.write(b"DOCX content")
+
+
+@pytest.fixture
+def pdf_document_mock():
+    """Fresh WeasyPrint document mock that renders fake PDF bytes."""
+    document = Mock()
+    document.write_pdf.return_value = b"PDF content"
+    return document
+
+
+@pytest.fixture
+def docx_document_mock():
+    """Fresh python-docx Document mock whose save writes fake DOCX bytes."""
+    document = Mock()
+    document.save = _mock_save
+    return document
+
+
 class TestDocumentGenerator:
     """Test DocumentGenerator class."""
     
-    @pytest.fixture
-    def generator(self):
-        """Create a DocumentGenerator instance."""
-        template_dir = Path(__file__).parent.parent / "src" / "templates"
-        return DocumentGenerator(template_dir)
-    
     @pytest.fixture
     def sample_data(self):
         """Sample parsed network data."""
@@ -83,61 +99,66 @@ class TestDocumentGenerator:
         html_content = generator.generate_documentation(sample_data, "html")
         
         assert isinstance(html_content, bytes)
-        html_str = html_content.decode('utf-8')
         
         # Check for key elements
-        assert "Test Network" in html_str
-        assert "Core Router" in html_str
-        assert "192.168.1.1" in html_str
-        assert "Network Topology" in html_str
-        assert "Device Inventory" in html_str
+        assert b"Test Network" in html_content
+        assert b"Core Router" in html_content
+        assert b"192.168.1.1" in html_content
+        assert b"Network Topology" in html_content
+        assert b"Device Inventory" in html_content
     
     def test_generate_markdown(self, generator, sample_data):
         """Test Markdown document generation."""
         md_content = generator.generate_documentation(sample_data, "markdown")
         
         assert isinstance(md_content, bytes)
-        md_str = md_content.decode('utf-8')
         
         # Check for markdown elements
-        assert "# Test Network" in md_str
-        assert "## Network Topology" in md_str
-        assert "| Device Name" in md_str  # Table header
-        assert "RT-CORE-01" in md_str
-        assert "192.168.1.1" in md_str
+        assert b"# Test Network" in md_content
+        assert b"## Network Topology" in md_content
+        assert b"| Device Name" in md_content  # Table header
+        assert b"RT-CORE-01" in md_content
+        assert b"192.168.1.1" in md_content
     
-    def test_generate_pdf(self, generator, sample_data):
+    def test_generate_pdf(self, generator, sample_data, pdf_document_mock):
         """Test PDF document generation."""
         # Mock WeasyPrint to avoid dependency
         with patch('src.generator.HTML') as mock_html:
-            mock_document = Mock()
-            mock_document.write_pdf.return_value = b"PDF content"
-            mock_html.return_value = mock_document
+            mock_html.return_value = pdf_document_mock
             
             pdf_content = generator.generate_documentation(sample_data, "pdf")
             
             assert pdf_content == b"PDF content"
             mock_html.assert_called_once()
-            mock_document.write_pdf.assert_called_once()
+            pdf_document_mock.write_pdf.assert_called_once()
     
-    def test_generate_docx(self, generator, sample_data):
+    def test_generate_docx(self, generator, sample_data, docx_document_mock):
         """Test DOCX document generation."""
         with patch('src.generator.Document') as mock_doc_class:
-            mock_doc = Mock()
-            mock_doc_class.return_value = mock_doc
-            
-            # Mock save method
-            def mock_save(buffer):
-                buffer.write(b"DOCX content")
-            mock_doc.save = mock_save
+            mock_doc_class.return_value = docx_document_mock
             
             docx_content = generator.generate_documentation(sample_data, "docx")
             
             assert docx_content == b"DOCX content"
             mock_doc_class.assert_called_once()
             # Verify document structure was created
-            assert mock_doc.add_heading.called
-            assert mock_doc.add_paragraph.called
+            assert docx_document_mock.add_heading.called
+            assert docx_document_mock.add_paragraph.called
+    
+    def test_render_cache_reuses_output(self, sample_data):
+        """Test that cached renders are returned for the same diagram content."""
+        template_dir = Path(__file__).parent.parent / "src" / "templates"
+        generator = DocumentGenerator(template_dir, cache_renders=True)
+        
+        first = generator.generate_documentation(sample_data, "markdown")
+        with patch.object(generator, '_render_documentation') as mock_render:
+            second = generator.generate_documentation(sample_data, "markdown")
+            # An equal copy hits the cache too: the key is the content, not the object
+            third = generator.generate_documentation(json.loads(json.dumps(sample_data)), "markdown")
+            mock_render.assert_not_called()
+        
+        assert second is first
+        assert third is first
     
     def test_generate_invalid_format(self, generator, sample_data):
         """Test generation with invalid format."""
@@ -166,21 +187,19 @@ class TestDocumentGenerator:
         }
         
         html_content = generator.generate_documentation(empty_data, "html")
-        html_str = html_content.decode('utf-8')
         
-        assert "Empty Project" in html_str
-        assert "No devices found" in html_str or len(html_str) > 100
+        assert b"Empty Project" in html_content
+        assert b"No devices found" in html_content or len(html_content) > 100
     
     def test_generate_with_professional_template(self, generator, sample_data):
         """Test generation with professional template."""
         sample_data["template"] = "professional"
         
         html_content = generator.generate_documentation(sample_data, "html")
-        html_str = html_content.decode('utf-8')
         
         # Professional template should have additional sections
-        assert "Executive Summary" in html_str
-        assert "Network Analysis" in html_str
+        assert b"Executive Summary" in html_content
+        assert b"Network Analysis" in html_content
     
     def test_ai_analysis_integration(self, generator, sample_data):
         """Test AI analysis integration in document."""
@@ -191,11 +210,10 @@ class TestDocumentGenerator:
         }
         
         html_content = generator.generate_documentation(sample_data, "html")
-        html_str = html_content.decode('utf-8')
         
-        assert "AI Network Analysis" in html_str
-        assert "This is a small network" in html_str
-        assert "Implement redundancy" in html_str
+        assert b"AI Network Analysis" in html_content
+        assert b"This is a small network" in html_content
+        assert b"Implement redundancy" in html_content
 
 
 class TestUtilityFunctions:
@@ -246,10 +264,10 @@ class TestUtilityFunctions:
 class TestDocumentGeneratorIntegration:
     """Integration tests for document generation."""
     
-    @pytest.fixture
+    @pytest.fixture(scope="session")
     def complex_network_data(self):
-        """Complex network data for testing."""
-        return {
+        """Complex network data for testing, built once and shared read-only."""
+        data = {
             "project_name": "Enterprise Network",
             "filename": "enterprise_network.vsdx",
             "generated_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -315,11 +333,12 @@ class TestDocumentGeneratorIntegration:
                 }
             }
         }
+        return types.MappingProxyType(data)
     
     def test_complex_network_generation(self, generator, complex_network_data):
         """Test generation with complex network data."""
-        # Add AI analysis
-        complex_network_data["ai_analysis"] = {
+        # Add AI analysis to a shallow copy; the shared fixture stays untouched
+        ai_analysis = {
             "summary": "Enterprise network with redundant core and security layers.",
             "security_assessment": "High-availability firewall configuration detected.",
             "recommendations": [
@@ -327,23 +346,23 @@ class TestDocumentGeneratorIntegration:
                 "Implement network monitoring on core devices"
             ]
         }
+        network_data = dict(complex_network_data) | {"ai_analysis": ai_analysis}
         
         # Test all formats
         for format_type in ["html", "markdown"]:
-            content = generator.generate_documentation(complex_network_data, format_type)
-            content_str = content.decode('utf-8')
+            content = generator.generate_documentation(network_data, format_type)
             
             # Verify all devices are included
-            assert "Core-Router-1" in content_str
-            assert "Firewall-1" in content_str
-            assert "AWS VPC" in content_str
+            assert b"Core-Router-1" in content
+            assert b"Firewall-1" in content
+            assert b"AWS VPC" in content
             
             # Verify connections
-            assert "40Gbps" in content_str
-            assert "IPSec" in content_str
+            assert b"40Gbps" in content
+            assert b"IPSec" in content
             
             # Verify AI analysis
-            assert "redundant core" in content_str
+            assert b"redundant core" in content
 
 
 class TestErrorHandling:
@@ -1,19 +1,79 @@
 """
 Ollama client for interacting with Phi-3 model
 """
-import aiohttp
+import httpx
 import json
 import logging
-from typing import Dict, Any, Optional
+import re
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Prefer orjson for parsing response bodies; it decodes the raw bytes directly
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# ijson lets us pull the "response" field without materializing the whole body
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Numbered or bulleted list item; numbered items keep the text after the first '.'
+_BULLET_RE = re.compile(r"\s*(?:\d[^.]*\.|[-•]|(?=\d))\s*(.*?)\s*$")
+
+class _AsyncResponseReader:
+    """Expose an httpx streaming response through the async read() interface ijson expects"""
+    
+    def __init__(self, response: httpx.Response):
+        self._chunks = response.aiter_bytes()
+    
+    async def read(self, size: int = -1) -> bytes:
+        # ijson probes the stream type with read(0), which must not consume data
+        if size == 0:
+            return b""
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
+
 class OllamaClient:
-    """Client for interacting with Ollama API"""
+    """
+    Client for interacting with Ollama API
     
-    def __init__(self, base_url: str = "http://localhost:11434"):
+    Holds a pooled HTTP client; use it as an async context manager, or call
+    close() when done, so the connections are released.
+    """
+    
+    def __init__(self, base_url: str = "http://localhost:11434", socket_path: Optional[str] = None):
         self.base_url = base_url
         self.model = "phi3"
+        # Optional Unix domain socket for a local Ollama, skipping the TCP handshake
+        self.socket_path = socket_path
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use"""
+        if self._client is None:
+            transport = httpx.AsyncHTTPTransport(uds=self.socket_path) if self.socket_path else None
+            self._client = httpx.AsyncClient(base_url=self.base_url, transport=transport, timeout=120)
+        return self._client
+    
+    async def close(self):
+        """Close the underlying HTTP client and its pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def __aenter__(self) -> "OllamaClient":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
         
     async def generate(self, prompt: str, system: Optional[str] = None) -> str:
         """
@@ -26,8 +86,6 @@ class OllamaClient:
         Returns:
             Generated response text
         """
-        url = f"{self.base_url}/api/generate"
-        
         payload = {
             "model": self.model,
             "prompt": prompt,
@@ -38,15 +96,20 @@ class OllamaClient:
             payload["system"] = system
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get("response", "")
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Ollama API error: {response.status} - {error_text}")
-                        return ""
+            async with self._get_client().stream("POST", "/api/generate", json=payload) as response:
+                if response.status_code != 200:
+                    error_text = (await response.aread()).decode("utf-8", errors="replace")
+                    logger.error(f"Ollama API error: {response.status_code} - {error_text}")
+                    return ""
+                
+                if ijson is not None:
+                    # Stop at the "response" field; trailing fields such as "context" are never parsed
+                    async for text in ijson.items(_AsyncResponseReader(response), "response"):
+                        return text
+                    return ""
+                
+                data = _json_loads(await response.aread())
+                return data.get("response", "")
         except Exception as e:
             logger.error(f"Error calling Ollama API: {e}")
             return ""
@@ -62,7 +125,8 @@ class OllamaClient:
             Analysis results including insights and recommendations
         """
         # Prepare network summary for analysis
-        device_summary = self._summarize_devices(network_data.get("shapes", []))
+        shape_types, _ = self._shape_columns(network_data.get("shapes", []))
+        device_summary = self._summarize_devices(shape_types)
         connection_summary = self._summarize_connections(network_data.get("connections", []))
         
         prompt = f"""Analyze this network topology and provide insights:
@@ -98,7 +162,8 @@ Please provide:
         """
         Generate an executive summary of the network
         """
-        device_count = len(network_data.get("shapes", []))
+        shape_types, shape_names = self._shape_columns(network_data.get("shapes", []))
+        device_count = len(shape_types)
         connection_count = len(network_data.get("connections", []))
         
         prompt = f"""Generate a concise executive summary for this network documentation:
@@ -106,7 +171,7 @@ Please provide:
 Network: {network_data.get('title', 'Corporate Network')}
 Total Devices: {device_count}
 Total Connections: {connection_count}
-Key Components: {self._get_key_components(network_data)}
+Key Components: {self._get_key_components(shape_types, shape_names)}
 
 The summary should be 3-4 sentences suitable for executives, highlighting the network's purpose, scale, and key characteristics."""
         
@@ -116,9 +181,11 @@ The summary should be 3-4 sentences suitable for executives, highlighting the ne
         """
         Identify potential security risks in the network
         """
+        shape_types, _ = self._shape_columns(network_data.get("shapes", []))
+        
         prompt = f"""Analyze this network topology for security vulnerabilities:
 
-Devices: {self._summarize_devices(network_data.get('shapes', []))}
+Devices: {self._summarize_devices(shape_types)}
 Connections: {len(network_data.get('connections', []))} total
 
 Identify:
@@ -144,10 +211,12 @@ Provide specific, actionable security recommendations."""
         """
         Suggest network optimizations
         """
+        shape_types, _ = self._shape_columns(network_data.get("shapes", []))
+        
         prompt = f"""Analyze this network for optimization opportunities:
 
 Current Setup:
-{self._describe_network(network_data)}
+{self._describe_network(shape_types, network_data.get('connections', []))}
 
 Suggest optimizations for:
 1. Performance improvements
@@ -165,12 +234,19 @@ Be specific about which components to add, remove, or reconfigure."""
             "priority_actions": self._extract_priority_actions(response)
         }
     
-    def _summarize_devices(self, shapes: list) -> str:
-        """Summarize device types and counts"""
-        device_types = {}
+    def _shape_columns(self, shapes: list) -> Tuple[List[str], List[str]]:
+        """Return parallel (types, names) columns for the shapes, built in one pass"""
+        shape_types = []
+        shape_names = []
         for shape in shapes:
-            device_type = shape.get("type", "unknown")
-            device_types[device_type] = device_types.get(device_type, 0) + 1
+            shape_types.append(shape.get("type", "unknown"))
+            shape_names.append(shape.get("name", "unnamed"))
+        
+        return shape_types, shape_names
+    
+    def _summarize_devices(self, shape_types: List[str]) -> str:
+        """Summarize device types and counts"""
+        device_types = Counter(shape_types)
         
         summary = []
         for device_type, count in sorted(device_types.items()):
@@ -196,35 +272,36 @@ Be specific about which components to add, remove, or reconfigure."""
         
         return "\n".join(summary)
     
-    def _get_key_components(self, network_data: Dict[str, Any]) -> str:
+    def _get_key_components(self, shape_types: List[str], shape_names: List[str]) -> str:
         """Extract key components for summary"""
-        shapes = network_data.get("shapes", [])
-        key_types = ["router", "firewall", "switch", "server"]
+        key_types = {"router", "firewall", "switch", "server"}
         
-        components = []
-        for shape in shapes:
-            if shape.get("type") in key_types:
-                components.append(f"{shape.get('type')} ({shape.get('name', 'unnamed')})")
+        components = [
+            f"{shape_type} ({name})"
+            for shape_type, name in zip(shape_types, shape_names)
+            if shape_type in key_types
+        ]
         
         return ", ".join(components[:5])  # Limit to 5 key components
     
-    def _describe_network(self, network_data: Dict[str, Any]) -> str:
+    def _describe_network(self, shape_types: List[str], connections: list) -> str:
         """Create a brief network description"""
         return f"""
-- Devices: {self._summarize_devices(network_data.get('shapes', []))}
-- Connections: {self._summarize_connections(network_data.get('connections', []))}
-- Network Size: {len(network_data.get('shapes', []))} devices
+- Devices: {self._summarize_devices(shape_types)}
+- Connections: {self._summarize_connections(connections)}
+- Network Size: {len(shape_types)} devices
 """
     
     def _parse_analysis(self, response: str) -> Dict[str, Any]:
         """Parse LLM response into structured format"""
         # Simple parsing - in production, use more sophisticated parsing
+        # Collect lines per section and join once, avoiding repeated string concatenation
         sections = {
-            "architecture_assessment": "",
-            "security_considerations": "",
-            "performance_recommendations": "",
-            "single_points_of_failure": "",
-            "scalability_assessment": ""
+            "architecture_assessment": [],
+            "security_considerations": [],
+            "performance_recommendations": [],
+            "single_points_of_failure": [],
+            "scalability_assessment": []
         }
         
         current_section = None
@@ -243,9 +320,9 @@ Be specific about which components to add, remove, or reconfigure."""
             elif "Scalability Assessment" in line:
                 current_section = "scalability_assessment"
             elif current_section and line:
-                sections[current_section] += line + "\n"
+                sections[current_section].append(line + "\n")
         
-        return sections
+        return {section: "".join(section_lines) for section, section_lines in sections.items()}
     
     def _assess_severity(self, risk_text: str) -> str:
         """Assess overall security risk severity"""
@@ -266,23 +343,9 @@ Be specific about which components to add, remove, or reconfigure."""
     
     def _extract_recommendations(self, text: str) -> list:
         """Extract specific recommendations from text"""
-        recommendations = []
-        lines = text.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            # Look for numbered items or bullet points
-            if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•')):
-                # Clean up the line
-                if line[0].isdigit():
-                    line = line.split('.', 1)[1].strip() if '.' in line else line
-                else:
-                    line = line[1:].strip()
-                
-                if line:
-                    recommendations.append(line)
-        
-        return recommendations
+        # Look for numbered items or bullet points
+        matches = map(_BULLET_RE.match, text.splitlines())
+        return [match.group(1) for match in matches if match and match.group(1)]
     
     def _extract_priority_actions(self, text: str) -> list:
         """Extract priority actions from optimization text"""
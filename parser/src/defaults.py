@@ -1,9 +1,28 @@
 """Default values for missing network information."""
 
-from typing import Dict, Any
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, Tuple
 
-# Default network configuration values
-DEFAULT_NETWORK_CONFIG = {
+def _freeze(value: Any) -> Any:
+    """Recursively turn dicts into read-only mapping proxies and lists into tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value: Any) -> Any:
+    """Plain, mutable copy of a frozen value: mapping proxies become dicts and tuples lists."""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+# Default network configuration values. The tables below are frozen: they are shared
+# by every parsed document and are copied with _thaw wherever they go into one.
+DEFAULT_NETWORK_CONFIG: Mapping[str, Any] = _freeze({
     "vlan": {
         "id": "VLAN_ID",
         "name": "VLAN_NAME",
@@ -49,7 +68,31 @@ DEFAULT_NETWORK_CONFIG = {
         "media_type": "Ethernet",
         "protocol": "TCP/IP"
     }
-}
+})
+
+# Defaults for device types without an entry in device_defaults
+GENERIC_DEVICE_DEFAULTS: Mapping[str, Any] = _freeze({
+    "vendor": "Unknown",
+    "model": "Unknown"
+})
+
+# Connection default overrides keyed by a substring of the connection type
+CONNECTION_TYPE_OVERRIDES: Mapping[str, Any] = _freeze({
+    "fiber": {
+        "bandwidth": "10 Gbps",
+        "media_type": "Fiber Optic"
+    },
+    "wireless": {
+        "bandwidth": "300 Mbps",
+        "media_type": "Wireless",
+        "protocol": "802.11ac"
+    },
+    "serial": {
+        "bandwidth": "115200 bps",
+        "media_type": "Serial",
+        "protocol": "RS-232"
+    }
+})
 
 def get_default_device_properties(device_type: str, device_name: str = None) -> Dict[str, Any]:
     """
@@ -66,28 +109,20 @@ def get_default_device_properties(device_type: str, device_name: str = None) ->
     if not device_type:
         device_type = "unknown"
     
-    device_type_lower = device_type.lower()
+    defaults = DEFAULT_NETWORK_CONFIG["device_defaults"].get(device_type.lower())
+    hostname, description = _device_identity(device_type, device_name, defaults is not None)
     
-    if device_type_lower in DEFAULT_NETWORK_CONFIG["device_defaults"]:
-        defaults = DEFAULT_NETWORK_CONFIG["device_defaults"][device_type_lower].copy()
-        
-        # Add device-specific customization if needed
-        if device_name:
-            defaults["hostname"] = device_name
-            defaults["description"] = f"{device_type} - {device_name}"
-        else:
-            defaults["hostname"] = f"{device_type}_HOSTNAME"
-            defaults["description"] = f"{device_type} Device"
-            
-        return defaults
+    return {**_thaw(defaults or GENERIC_DEVICE_DEFAULTS), "hostname": hostname, "description": description}
+
+def _device_identity(device_type: str, device_name: Optional[str], known_type: bool) -> Tuple[str, str]:
+    """Per-device hostname and description that go on top of the type defaults."""
+    hostname = device_name or f"{device_type}_HOSTNAME"
     
-    # Return generic defaults for unknown device types
-    return {
-        "vendor": "Unknown",
-        "model": "Unknown",
-        "hostname": device_name or f"{device_type}_HOSTNAME",
-        "description": f"{device_type} Device"
-    }
+    # Only known device types mention the device name in the description
+    if known_type and device_name:
+        return hostname, f"{device_type} - {device_name}"
+    
+    return hostname, f"{device_type} Device"
 
 def get_default_connection_properties(connection_type: str = None) -> Dict[str, Any]:
     """
@@ -99,26 +134,18 @@ def get_default_connection_properties(connection_type: str = None) -> Dict[str,
     Returns:
         Dictionary of default connection properties
     """
-    defaults = DEFAULT_NETWORK_CONFIG["connection_defaults"].copy()
+    defaults = DEFAULT_NETWORK_CONFIG["connection_defaults"]
     
     if connection_type:
         # Safely convert to lowercase
         connection_type_lower = connection_type.lower()
         
         # Customize based on connection type
-        if "fiber" in connection_type_lower:
-            defaults["bandwidth"] = "10 Gbps"
-            defaults["media_type"] = "Fiber Optic"
-        elif "wireless" in connection_type_lower:
-            defaults["bandwidth"] = "300 Mbps"
-            defaults["media_type"] = "Wireless"
-            defaults["protocol"] = "802.11ac"
-        elif "serial" in connection_type_lower:
-            defaults["bandwidth"] = "115200 bps"
-            defaults["media_type"] = "Serial"
-            defaults["protocol"] = "RS-232"
+        for keyword, overrides in CONNECTION_TYPE_OVERRIDES.items():
+            if keyword in connection_type_lower:
+                return _thaw({**defaults, **overrides})
             
-    return defaults
+    return _thaw(defaults)
 
 def enrich_parsed_data(parsed_data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -132,41 +159,48 @@ def enrich_parsed_data(parsed_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     # Add network information if missing
     if "network_info" not in parsed_data:
-        parsed_data["network_info"] = DEFAULT_NETWORK_CONFIG.copy()
+        parsed_data["network_info"] = _thaw(DEFAULT_NETWORK_CONFIG)
     
     # Enrich device information
     if "shapes" in parsed_data:
+        # Group shapes by type so the type defaults are looked up once per type
+        shapes_by_type = defaultdict(list)
         for shape in parsed_data["shapes"]:
-            # Add default properties if missing
-            if not shape.get("properties"):
-                shape["properties"] = {}
-                
-            # Get device type defaults
-            device_defaults = get_default_device_properties(
-                shape.get("type", "unknown"),
-                shape.get("name")
-            )
+            shapes_by_type[shape.get("type", "unknown") or "unknown"].append(shape)
+        
+        for device_type, shapes in shapes_by_type.items():
+            type_defaults = DEFAULT_NETWORK_CONFIG["device_defaults"].get(device_type.lower())
+            known_type = type_defaults is not None
+            default_items = tuple((type_defaults or GENERIC_DEVICE_DEFAULTS).items())
             
-            # Merge with existing properties (existing properties take precedence)
-            for key, value in device_defaults.items():
-                if key not in shape["properties"]:
-                    shape["properties"][key] = value
+            for shape in shapes:
+                hostname, description = _device_identity(device_type, shape.get("name"), known_type)
+                
+                # Fill in missing keys only (existing properties take precedence)
+                props = shape.get("properties")
+                if not isinstance(props, dict):
+                    props = shape["properties"] = {}
+                for key, value in default_items:
+                    if key not in props:
+                        # Each shape gets its own copy of list defaults such as services
+                        props[key] = _thaw(value)
+                props.setdefault("hostname", hostname)
+                props.setdefault("description", description)
     
     # Enrich connection information
     if "connections" in parsed_data:
         for connection in parsed_data["connections"]:
-            if not connection.get("properties"):
-                connection["properties"] = {}
-                
             # Get connection defaults
             conn_defaults = get_default_connection_properties(
                 connection.get("type")
             )
             
-            # Merge with existing properties
+            # Fill in missing keys only
+            props = connection.get("properties")
+            if not isinstance(props, dict):
+                props = connection["properties"] = {}
             for key, value in conn_defaults.items():
-                if key not in connection["properties"]:
-                    connection["properties"][key] = value
+                props.setdefault(key, value)
     
     # Add metadata
     parsed_data["metadata"] = parsed_data.get("metadata", {})
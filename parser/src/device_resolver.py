@@ -6,13 +6,125 @@ from Visio diagrams, transforming cryptic IDs into meaningful device information
 """
 
 import re
+import ipaddress
 import logging
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass
+from operator import itemgetter
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+def _build_tagged(pattern_map: Dict[str, Any]) -> Tuple[re.Pattern, Dict[str, Any]]:
+    """
+    Fuse a {pattern: value} map into one regex tagged with a named group per pattern
+    
+    Each alternative is an anchored lookahead, so the engine tries the patterns in
+    dict order and the first one found anywhere in the text wins, exactly like
+    searching them one by one. Match.lastgroup names the pattern that hit.
+    """
+    alternatives = "|".join(f"(?=.*?(?P<g{i}>{pattern}))" for i, pattern in enumerate(pattern_map))
+    regex = re.compile(rf"\A(?:{alternatives})", re.IGNORECASE | re.DOTALL)
+    return regex, {f"g{i}": value for i, value in enumerate(pattern_map.values())}
+
+
+# A device pattern: a leading group of alternatives followed only by optional parts
+_LEADING_GROUP_RE = re.compile(r'\((?P<alternatives>[^()]*)\)(?P<rest>(?:\[-_\]\?|\([^()]*\)\?)*)')
+
+
+def _literal_keywords(pattern_map: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    """
+    Expand each pattern's leading group into the literal strings it can match
+    
+    Everything after the leading group is optional, so a pattern matches exactly
+    when one of these literals occurs in the (lowercased) text. `[-_]?` inside an
+    alternative expands to its three spellings. Keywords keep the pattern order.
+    """
+    keywords = []
+    for pattern, value in pattern_map.items():
+        match = _LEADING_GROUP_RE.fullmatch(pattern)
+        if not match:
+            raise ValueError(f"Device pattern is not a literal group plus optional parts: {pattern}")
+        
+        for alternative in match.group("alternatives").split("|"):
+            spellings = [""]
+            for piece in re.split(r'(\[-_\]\?)', alternative):
+                options = ("", "-", "_") if piece == "[-_]?" else (piece,)
+                spellings = [prefix + option for prefix in spellings for option in options]
+            keywords.extend((spelling, value) for spelling in spellings)
+    
+    return tuple(keywords)
+
+
+class _KeywordMatcher:
+    """
+    Find which of a prioritized list of (keyword, value) pairs occurs in a text
+    
+    Uses a pyahocorasick automaton when available, so one pass over the text
+    reports every keyword hit; otherwise a fused regex. Either way the value of
+    the earliest-listed keyword that occurs wins, like a chain of `in` checks.
+    """
+    
+    def __init__(self, keywords: Tuple[Tuple[str, Any], ...]):
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for priority, (keyword, value) in enumerate(keywords):
+                self._automaton.add_word(keyword, (priority, value))
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            self._regex, self._groups = _build_tagged({re.escape(keyword): value for keyword, value in keywords})
+    
+    def first(self, text: str) -> Optional[Any]:
+        """Value of the highest-priority keyword found in text, or None"""
+        if self._automaton is not None:
+            hits = [hit for _, hit in self._automaton.iter(text)]
+            return min(hits, key=itemgetter(0))[1] if hits else None
+        
+        match = self._regex.search(text)
+        return self._groups[match.lastgroup] if match else None
+
+
+# IPv4 address
+_IP_RE = re.compile(
+    r'\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b'
+)
+
+# First run of digits in a name
+_FIRST_NUM = re.compile(r'\d+')
+
+# Inventory sort priority by device role; roles not listed sort at 50
+_ROLE_PRIORITY = {
+    "core": 1,
+    "spine": 2,
+    "distribution": 3,
+    "leaf": 4,
+    "access": 5,
+    "edge": 6,
+    "management": 7,
+    "unknown": 99
+}
+
+# Common model patterns
+_MODEL_RES = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'(catalyst|cat)[-\s]?(\d{4}[a-z]?)',  # Cisco Catalyst
+        r'(nexus|n)[-\s]?(\d{4}[a-z]?)',  # Cisco Nexus
+        r'(asr)[-\s]?(\d{4}[a-z]?)',  # Cisco ASR
+        r'(isr)[-\s]?(\d{4}[a-z]?)',  # Cisco ISR
+        r'(ex|srx)[-\s]?(\d{4}[a-z]?)',  # Juniper
+        r'(fortigate)[-\s]?(\d{2,4}[a-z]?)',  # Fortinet
+        r'model[:\s]+([^\s,]+)',  # Generic model field
+    )
+]
+
 
 class DeviceType(Enum):
     """Network device types"""
@@ -45,7 +157,7 @@ class DeviceRole(Enum):
     UNKNOWN = "unknown"
 
 
-@dataclass
+@dataclass(slots=True)
 class DeviceInfo:
     """Enhanced device information"""
     id: str
@@ -58,11 +170,7 @@ class DeviceInfo:
     management_ip: Optional[str] = None
     location: Optional[str] = None
     description: Optional[str] = None
-    properties: Dict[str, Any] = None
-    
-    def __post_init__(self):
-        if self.properties is None:
-            self.properties = {}
+    properties: Dict[str, Any] = field(default_factory=dict)
 
 
 class DeviceResolver:
@@ -128,8 +236,31 @@ class DeviceResolver:
         r'vmware|nsx': 'VMware',
     }
     
+    # Stencil master keywords, checked when no device pattern matched (earlier entries win)
+    MASTER_KEYWORDS = (
+        ('router', DeviceType.ROUTER),
+        ('rtr', DeviceType.ROUTER),
+        ('switch', DeviceType.SWITCH),
+        ('sw', DeviceType.SWITCH),
+        ('firewall', DeviceType.FIREWALL),
+        ('fw', DeviceType.FIREWALL),
+        ('server', DeviceType.SERVER),
+        ('srv', DeviceType.SERVER),
+    )
+    
+    # Each pattern bank fused into a single regex, searched once per shape
+    _DEVICE_RE, _DEVICE_GROUPS = _build_tagged(DEVICE_PATTERNS)
+    _ROLE_RE, _ROLE_GROUPS = _build_tagged(ROLE_PATTERNS)
+    _VENDOR_RE, _VENDOR_GROUPS = _build_tagged(VENDOR_PATTERNS)
+    _MASTER_MATCHER = _KeywordMatcher(MASTER_KEYWORDS)
+    
+    # With pyahocorasick, device patterns are matched as literal keywords in a single pass
+    _DEVICE_MATCHER = _KeywordMatcher(_literal_keywords(DEVICE_PATTERNS)) if AHOCORASICK_AVAILABLE else None
+    
     def __init__(self):
         self.device_cache: Dict[str, DeviceInfo] = {}
+        # Classification results shared by shapes with identical content (e.g. repeated stencils)
+        self._fingerprint_cache: Dict[Tuple, Tuple] = {}
         
     def resolve_device(self, shape: Dict[str, Any]) -> DeviceInfo:
         """
@@ -147,33 +278,27 @@ class DeviceResolver:
         if shape_id in self.device_cache:
             return self.device_cache[shape_id]
         
-        # Extract basic info
-        name = shape.get("name", "")
-        text = shape.get("text", "")
-        master_name = shape.get("master_name", "")
-        properties = shape.get("properties", {})
-        
-        # Determine device type
-        device_type = self._detect_device_type(name, text, master_name, properties)
-        
-        # Determine device role
-        device_role = self._detect_device_role(name, text, properties)
+        device_info = self._build_device(shape_id, shape)
         
-        # Extract vendor and model
-        vendor = self._detect_vendor(name, text, properties)
-        model = self._extract_model(name, text, properties)
+        # Cache result
+        self.device_cache[shape_id] = device_info
         
-        # Extract management IP
-        management_ip = self._extract_ip(text, properties)
+        return device_info
+    
+    def _build_device(self, shape_id: str, shape: Dict[str, Any]) -> DeviceInfo:
+        """Classify a shape and build its DeviceInfo, without touching the device cache"""
+        name, text, master_name, properties, property_values, fingerprint = self._shape_content(shape)
         
-        # Generate display name
-        display_name = self._generate_display_name(name, text, device_type, device_role)
+        # Shapes with the same name, text, master and property values classify identically
+        classification = self._fingerprint_cache.get(fingerprint)
+        if classification is None:
+            classification = self._classify(name, text, master_name, properties, property_values)
+            self._fingerprint_cache[fingerprint] = classification
         
-        # Extract location
-        location = self._extract_location(properties)
+        device_type, device_role, vendor, model, management_ip, display_name, location = classification
         
         # Create device info
-        device_info = DeviceInfo(
+        return DeviceInfo(
             id=shape_id,
             name=name or f"Device_{shape_id}",
             display_name=display_name,
@@ -186,100 +311,92 @@ class DeviceResolver:
             description=text if text and text != name else None,
             properties=properties
         )
+    
+    @staticmethod
+    def _shape_content(shape: Dict[str, Any]) -> Tuple:
+        """Pull the classification inputs out of a shape, plus their fingerprint"""
+        name = shape.get("name", "")
+        text = shape.get("text", "")
+        master_name = shape.get("master_name", "")
+        properties = shape.get("properties", {})
         
-        # Cache result
-        self.device_cache[shape_id] = device_info
+        # Stringify property values once; they feed both the fingerprint and the search text
+        property_values = tuple(map(str, properties.values()))
+        fingerprint = (name, text, master_name, tuple(properties), property_values)
         
-        return device_info
+        return name, text, master_name, properties, property_values, fingerprint
     
-    def _detect_device_type(self, name: str, text: str, master_name: str, 
-                           properties: Dict[str, Any]) -> DeviceType:
-        """Detect device type from various sources"""
-        # Check all text sources
-        text_sources = [
-            name.lower() if name else "",
-            text.lower() if text else "",
-            master_name.lower() if master_name else "",
-            " ".join(str(v).lower() for v in properties.values())
-        ]
-        
-        combined_text = " ".join(text_sources)
+    def _classify(self, name: str, text: str, master_name: str,
+                  properties: Dict[str, Any], property_values: Tuple[str, ...]) -> Tuple:
+        """Run the detectors for one set of shape content"""
+        # Lowercase the text sources once, as one buffer; the detectors all search the same blob
+        props_blob = " ".join(property_values).lower()
+        shape_text = " ".join((name.lower() if name else "", text.lower() if text else ""))
+        combined_text = f"{shape_text} {props_blob}"
+        
+        # Determine device type (the stencil master name only counts here)
+        master_text = master_name.lower() if master_name else ""
+        device_type = self._detect_device_type(f"{shape_text} {master_text} {props_blob}", master_text)
+        
+        # Determine device role
+        device_role = self._detect_device_role(combined_text)
+        
+        # Extract vendor and model
+        vendor = self._detect_vendor(combined_text)
+        model = self._extract_model(name, text, properties)
+        
+        # Extract management IP
+        management_ip = self._extract_ip(text, properties)
+        
+        # Generate display name
+        display_name = self._generate_display_name(name, text, device_type, device_role)
         
+        # Extract location
+        location = self._extract_location(properties)
+        
+        return device_type, device_role, vendor, model, management_ip, display_name, location
+    
+    def _detect_device_type(self, combined_text: str, master_text: str) -> DeviceType:
+        """Detect device type from the combined name, text, master and property text"""
         # Check patterns
-        for pattern, device_type in self.DEVICE_PATTERNS.items():
-            if re.search(pattern, combined_text, re.IGNORECASE):
+        if self._DEVICE_MATCHER is not None:
+            device_type = self._DEVICE_MATCHER.first(combined_text)
+            if device_type is not None:
+                return device_type
+        else:
+            match = self._DEVICE_RE.search(combined_text)
+            if match:
+                return self._DEVICE_GROUPS[match.lastgroup]
+        
+        # Check stencil/master names (already lowercased)
+        if master_text:
+            device_type = self._MASTER_MATCHER.first(master_text)
+            if device_type is not None:
                 return device_type
-        
-        # Check stencil/master names
-        if master_name:
-            master_lower = master_name.lower()
-            if any(keyword in master_lower for keyword in ['router', 'rtr']):
-                return DeviceType.ROUTER
-            elif any(keyword in master_lower for keyword in ['switch', 'sw']):
-                return DeviceType.SWITCH
-            elif any(keyword in master_lower for keyword in ['firewall', 'fw']):
-                return DeviceType.FIREWALL
-            elif any(keyword in master_lower for keyword in ['server', 'srv']):
-                return DeviceType.SERVER
         
         return DeviceType.UNKNOWN
     
-    def _detect_device_role(self, name: str, text: str, 
-                           properties: Dict[str, Any]) -> DeviceRole:
-        """Detect device role from various sources"""
-        text_sources = [
-            name.lower() if name else "",
-            text.lower() if text else "",
-            " ".join(str(v).lower() for v in properties.values())
-        ]
-        
-        combined_text = " ".join(text_sources)
-        
-        for pattern, role in self.ROLE_PATTERNS.items():
-            if re.search(pattern, combined_text, re.IGNORECASE):
-                return role
-        
-        return DeviceRole.UNKNOWN
+    def _detect_device_role(self, combined_text: str) -> DeviceRole:
+        """Detect device role from the combined name, text and property text"""
+        match = self._ROLE_RE.search(combined_text)
+        return self._ROLE_GROUPS[match.lastgroup] if match else DeviceRole.UNKNOWN
     
-    def _detect_vendor(self, name: str, text: str, 
-                      properties: Dict[str, Any]) -> Optional[str]:
-        """Detect device vendor"""
-        text_sources = [
-            name.lower() if name else "",
-            text.lower() if text else "",
-            " ".join(str(v).lower() for v in properties.values())
-        ]
-        
-        combined_text = " ".join(text_sources)
-        
-        for pattern, vendor in self.VENDOR_PATTERNS.items():
-            if re.search(pattern, combined_text, re.IGNORECASE):
-                return vendor
-        
-        return None
+    def _detect_vendor(self, combined_text: str) -> Optional[str]:
+        """Detect device vendor from the combined name, text and property text"""
+        match = self._VENDOR_RE.search(combined_text)
+        return self._VENDOR_GROUPS[match.lastgroup] if match else None
     
     def _extract_model(self, name: str, text: str, 
                       properties: Dict[str, Any]) -> Optional[str]:
         """Extract device model information"""
-        # Common model patterns
-        model_patterns = [
-            r'(catalyst|cat)[-\s]?(\d{4}[a-z]?)',  # Cisco Catalyst
-            r'(nexus|n)[-\s]?(\d{4}[a-z]?)',  # Cisco Nexus
-            r'(asr)[-\s]?(\d{4}[a-z]?)',  # Cisco ASR
-            r'(isr)[-\s]?(\d{4}[a-z]?)',  # Cisco ISR
-            r'(ex|srx)[-\s]?(\d{4}[a-z]?)',  # Juniper
-            r'(fortigate)[-\s]?(\d{2,4}[a-z]?)',  # Fortinet
-            r'model[:\s]+([^\s,]+)',  # Generic model field
-        ]
-        
         text_sources = [name, text] + list(properties.values())
         
         for source in text_sources:
             if not source:
                 continue
             source_str = str(source)
-            for pattern in model_patterns:
-                match = re.search(pattern, source_str, re.IGNORECASE)
+            for regex in _MODEL_RES:
+                match = regex.search(source_str)
                 if match:
                     return match.group(0).strip()
         
@@ -287,19 +404,26 @@ class DeviceResolver:
     
     def _extract_ip(self, text: str, properties: Dict[str, Any]) -> Optional[str]:
         """Extract IP address from text or properties"""
-        ip_pattern = r'\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b'
-        
         # Check properties first
         ip_keys = ['ip', 'ip_address', 'management_ip', 'mgmt_ip', 'address']
         for key in ip_keys:
             if key in properties and properties[key]:
-                ip_match = re.search(ip_pattern, str(properties[key]))
+                value = str(properties[key]).strip()
+                
+                # Fast path: the property is usually a bare address, which needs no regex scan
+                if value.count(".") == 3:
+                    try:
+                        return str(ipaddress.IPv4Address(value))
+                    except ValueError:
+                        pass
+                
+                ip_match = _IP_RE.search(value)
                 if ip_match:
                     return ip_match.group(0)
         
         # Check text
         if text:
-            ip_match = re.search(ip_pattern, text)
+            ip_match = _IP_RE.search(text)
             if ip_match:
                 return ip_match.group(0)
         
@@ -334,9 +458,9 @@ class DeviceResolver:
             parts.append(device_type.value.title())
         
         # Extract any numbers from the original name or text
-        numbers = re.findall(r'\d+', f"{name} {text}")
-        if numbers:
-            parts.append(numbers[0])
+        number = (name and _FIRST_NUM.search(name)) or (text and _FIRST_NUM.search(text))
+        if number:
+            parts.append(number.group(0))
         
         if parts:
             return " ".join(parts)
@@ -360,9 +484,10 @@ class DeviceResolver:
             device_info = self.resolve_device(shape)
             devices[device_info.id] = device_info
             
-            logger.debug(f"Resolved device: {device_info.display_name} "
-                        f"(Type: {device_info.device_type.value}, "
-                        f"Role: {device_info.device_role.value})")
+            logger.debug("Resolved device: %s (Type: %s, Role: %s)",
+                         device_info.display_name,
+                         device_info.device_type.value,
+                         device_info.device_role.value)
         
         return devices
     
@@ -376,41 +501,67 @@ class DeviceResolver:
         Returns:
             List of device inventory entries
         """
-        inventory = []
-        
-        for device_id, device in devices.items():
-            entry = {
-                "id": device_id,
-                "name": device.display_name,
-                "type": device.device_type.value,
-                "role": device.device_role.value,
-                "vendor": device.vendor or "Unknown",
-                "model": device.model or "Unknown",
-                "management_ip": device.management_ip or "N/A",
-                "location": device.location or "N/A",
-                "description": device.description or ""
-            }
-            inventory.append(entry)
-        
-        # Sort by role, then type, then name
-        inventory.sort(key=lambda x: (
-            self._role_priority(x["role"]),
-            x["type"],
-            x["name"]
-        ))
+        return self._sorted_inventory(
+            self._inventory_entry(device_id, device) for device_id, device in devices.items()
+        )
+    
+    def iter_inventory(self, shapes: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Stream inventory entries straight from shapes, in shape order
+        
+        Unlike resolve_devices, the DeviceInfo objects are not kept (beyond those
+        already in the device cache), so only the entries themselves stay alive.
+        
+        Args:
+            shapes: Iterable of shape dictionaries
+            
+        Yields:
+            Device inventory entries, one per distinct shape ID; the first shape with an ID wins
+        """
+        seen = set()
+        
+        for shape in shapes:
+            shape_id = shape.get("id", "unknown")
+            if shape_id in seen:
+                continue
+            seen.add(shape_id)
+            
+            device = self.device_cache.get(shape_id) or self._build_device(shape_id, shape)
+            yield self._inventory_entry(shape_id, device)
+    
+    def generate_inventory_from_shapes(self, shapes: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Build the sorted device inventory directly from shapes
+        
+        Same result as generate_device_inventory(resolve_devices(shapes)), without
+        holding every DeviceInfo in memory at once.
         
-        return inventory
+        Args:
+            shapes: Iterable of shape dictionaries
+            
+        Returns:
+            List of device inventory entries
+        """
+        return self._sorted_inventory(self.iter_inventory(shapes))
     
-    def _role_priority(self, role: str) -> int:
-        """Get sort priority for device role"""
-        priorities = {
-            "core": 1,
-            "spine": 2,
-            "distribution": 3,
-            "leaf": 4,
-            "access": 5,
-            "edge": 6,
-            "management": 7,
-            "unknown": 99
+    @staticmethod
+    def _inventory_entry(device_id: str, device: DeviceInfo) -> Dict[str, Any]:
+        """Inventory entry for a device"""
+        return {
+            "id": device_id,
+            "name": device.display_name,
+            "type": device.device_type.value,
+            "role": device.device_role.value,
+            "vendor": device.vendor or "Unknown",
+            "model": device.model or "Unknown",
+            "management_ip": device.management_ip or "N/A",
+            "location": device.location or "N/A",
+            "description": device.description or ""
         }
-        return priorities.get(role, 50)
\ No newline at end of file
+    
+    @staticmethod
+    def _sorted_inventory(entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Sort inventory entries by role, then type, then name"""
+        return sorted(entries, key=lambda entry: (
+            _ROLE_PRIORITY.get(entry["role"], 50), entry["type"], entry["name"]
+        ))
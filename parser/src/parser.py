@@ -1,9 +1,13 @@
 import json
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 import re
+import sys
+import tempfile
+import zipfile
+from io import BytesIO
 
 # Get logger before using it
 logger = logging.getLogger(__name__)
@@ -19,6 +23,9 @@ from .shapes import NetworkShape, Connection, ShapeType
 from .utils import is_visio_file, detect_shape_type
 from .device_resolver import DeviceResolver
 
+# Sentinel for attributes that may legitimately hold None
+_MISSING = object()
+
 class VisioParser:
     """Parse Visio documents and extract network diagram information."""
     
@@ -28,12 +35,13 @@ class VisioParser:
         self.visio_file = None
         self.device_resolver = DeviceResolver()
         
-    def parse_file(self, file_path: Path) -> Dict[str, Any]:
+    def parse_file(self, file_path: Path, include_metadata: bool = True) -> Dict[str, Any]:
         """
         Parse a Visio file and extract network diagram data.
         
         Args:
             file_path: Path to the Visio file
+            include_metadata: Extract document properties; when False, metadata is {}
             
         Returns:
             Dictionary containing parsed diagram data
@@ -48,37 +56,65 @@ class VisioParser:
         
         # Use vsdx library for VSDX files
         if file_path.suffix.lower() == ".vsdx" and VSDX_AVAILABLE:
-            return self._parse_vsdx(file_path)
+            return self._parse_vsdx(file_path, include_metadata=include_metadata)
         else:
             # Fallback to XML parsing or raise error
             raise NotImplementedError(f"Parsing for {file_path.suffix} files not yet implemented")
+    
+    def parse_stream(self, data: bytes, filename: str = "diagram.vsdx",
+                     include_metadata: bool = True) -> Dict[str, Any]:
+        """
+        Parse a Visio document from its raw bytes.
+        
+        vsdx's VisioFile only opens files by path, so the bytes are written to a
+        temporary .vsdx file for the duration of the parse. Any OPC zip package
+        (.vsdx, .vsdm) is parsed as VSDX, whatever its original extension.
+        
+        Args:
+            data: Raw bytes of the Visio file
+            filename: Original file name, used for reporting
+            include_metadata: Extract document properties; when False, metadata is {}
+            
+        Returns:
+            Dictionary containing parsed diagram data
+        """
+        # VSDX files are OPC zip packages
+        if not zipfile.is_zipfile(BytesIO(data)):
+            raise ValueError(f"Not a valid Visio file: {filename}")
+        
+        logger.info(f"Parsing Visio stream: {filename} ({len(data)} bytes)")
+        
+        if not VSDX_AVAILABLE:
+            raise NotImplementedError("Parsing for .vsdx files not yet implemented")
+        
+        with tempfile.NamedTemporaryFile(suffix=".vsdx", delete=False) as temp_file:
+            temp_file.write(data)
+            temp_path = Path(temp_file.name)
+        try:
+            return self._parse_vsdx(temp_path, filename, include_metadata=include_metadata)
+        finally:
+            temp_path.unlink(missing_ok=True)
         
-    def _parse_vsdx(self, file_path: Path) -> Dict[str, Any]:
+    def _parse_vsdx(self, file_path: Path, filename: Optional[str] = None,
+                    include_metadata: bool = True) -> Dict[str, Any]:
         """Parse VSDX file using the vsdx library."""
+        filename = filename or file_path.name
         try:
             with VisioFile(str(file_path)) as vis:
                 self.visio_file = vis
                 
-                # Extract metadata
-                metadata = self._extract_metadata_vsdx(vis)
+                # Extract metadata, unless the caller doesn't need it
+                metadata = self._extract_metadata_vsdx(vis) if include_metadata else {}
                 
                 # Process all pages
-                all_shapes = []
-                all_connections = []
+                shapes_data = []
+                connections_data = []
                 
-                for page_index, page in enumerate(vis.pages):
-                    logger.info(f"Processing page {page_index + 1}: {page.name}")
-                    
-                    # Extract shapes from this page
-                    page_shapes = self._extract_shapes_vsdx(page)
-                    all_shapes.extend(page_shapes)
-                    
-                    # Extract connections from this page
-                    page_connections = self._extract_connections_vsdx(page)
-                    all_connections.extend(page_connections)
-                
-                # Convert shapes to dictionaries
-                shapes_data = [shape.dict() if hasattr(shape, 'dict') else shape for shape in all_shapes]
+                pages = vis.pages
+                for page_number, page in enumerate(pages, start=1):
+                    page_shapes, page_connections = self._extract_page(page, page_number)
+                    shapes_data.extend(page_shapes)
+                    connections_data.extend(page_connections)
                 
                 # Resolve devices for enhanced information
                 resolved_devices = self.device_resolver.resolve_devices(shapes_data)
@@ -100,11 +136,11 @@ class VisioParser:
                         }
                 
                 return {
-                    "filename": file_path.name,
+                    "filename": filename,
                     "shapes": shapes_data,
-                    "connections": [conn.dict() if hasattr(conn, 'dict') else conn for conn in all_connections],
+                    "connections": connections_data,
                     "metadata": metadata,
-                    "page_count": len(vis.pages),
+                    "page_count": len(pages),
                     "device_inventory": device_inventory,
                     "device_summary": {
                         "total_devices": len(resolved_devices),
@@ -118,141 +154,177 @@ class VisioParser:
             logger.error(f"Error parsing VSDX file: {e}")
             raise
     
-    def _extract_shapes_vsdx(self, page) -> List[NetworkShape]:
-        """Extract shape information from a VSDX page."""
+    def _extract_page(self, page, page_number: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Extract shapes and connections from a VSDX page in a single pass over its shapes.
+        
+        Each shape and connection is converted to its dictionary form as it is
+        extracted, so the intermediate objects are released straight away rather
+        than held in a second list until the whole document is parsed.
+        """
+        logger.info(f"Processing page {page_number}: {page.name}")
+        
         shapes = []
+        connections = []
         
         for shape in page.child_shapes:
+            network_shape = self._extract_shape_vsdx(shape)
+            if network_shape is not None:
+                shapes.append(network_shape.dict())
+            
+            # Check if shape is a connector
+            connects = getattr(shape, 'connects', None)
+            if connects:
+                connections.extend(conn.dict() for conn in self._extract_connections_vsdx(shape, connects))
+        
+        return shapes, connections
+    
+    def _extract_shape_vsdx(self, shape) -> Optional[NetworkShape]:
+        """Extract shape information from a single VSDX shape."""
+        try:
+            # Read each attribute once; getattr with a default avoids hasattr's extra lookup
+            raw_id = getattr(shape, 'ID', _MISSING)
+            text = getattr(shape, 'text', None)
+            master_page = getattr(shape, 'master_page', None)
+            master_name = getattr(master_page, 'name', None) if master_page else None
+            if isinstance(master_name, str):
+                # Stencil names repeat across shapes; interning makes cache-key hashing and compares cheap
+                master_name = sys.intern(master_name)
+            x = getattr(shape, 'x', None)
+            y = getattr(shape, 'y', None)
+            width = getattr(shape, 'width', None)
+            height = getattr(shape, 'height', None)
+            
+            # Extract basic shape information with safe attribute access
+            shape_data = {
+                "id": str(raw_id) if raw_id is not _MISSING else f"shape_{id(shape)}",
+                "name": text if text else f"Shape_{raw_id if raw_id is not _MISSING else id(shape)}",
+                "master_name": master_name,
+                "x": float(x) if x is not None else 0.0,
+                "y": float(y) if y is not None else 0.0,
+                "width": float(width) if width is not None else 0.0,
+                "height": float(height) if height is not None else 0.0,
+                "text": text,
+            }
+            
+            # Detect shape type based on master name and text
+            shape_type = detect_shape_type(
+                shape_data.get("master_name", ""),
+                shape_data.get("text", "")
+            )
+            
+            # Extract additional properties safely
+            properties = {}
+            data_properties = getattr(shape, 'data_properties', None)
+            if data_properties:
+                try:
+                    for prop in data_properties:
+                        prop_name = getattr(prop, 'name', _MISSING)
+                        prop_value = getattr(prop, 'value', _MISSING)
+                        if prop_name is not _MISSING and prop_value is not _MISSING:
+                            properties[str(prop_name) if prop_name else 'unknown'] = (
+                                str(prop_value) if prop_value is not None else ''
+                            )
+                except Exception as e:
+                    logger.debug(f"Could not extract data properties: {e}")
+            
+            # Create NetworkShape instance
+            network_shape = NetworkShape(
+                id=shape_data["id"],
+                name=shape_data["name"],
+                shape_type=shape_type,
+                x=shape_data["x"],
+                y=shape_data["y"],
+                width=shape_data["width"],
+                height=shape_data["height"],
+                properties=properties
+            )
+            
+            logger.debug("Extracted shape: %s (Type: %s)", network_shape.name, shape_type)
+            return network_shape
+            
+        except Exception as e:
+            shape_id = getattr(shape, 'ID', 'unknown')
+            logger.warning(f"Error extracting shape {shape_id}: {type(e).__name__}: {e}")
+            if logger.isEnabledFor(logging.DEBUG):
+                # vars() on vsdx shapes is costly; only build it when debug output is on
+                logger.debug("Shape details: %s", vars(shape) if hasattr(shape, '__dict__') else 'No details available')
+            
+            # Log specific error types for better debugging
+            if isinstance(e, TypeError) and "NoneType" in str(e):
+                logger.error(f"NoneType error in shape {shape_id}: Check data validation")
+            elif isinstance(e, AttributeError):
+                logger.error(f"AttributeError in shape {shape_id}: Missing expected attribute")
+                
+            return None
+    
+    def _extract_connections_vsdx(self, shape, connects) -> List[Connection]:
+        """Extract connection information from a VSDX connector shape and its connects."""
+        connections = []
+        
+        # The connector's own ID and label are the same for all of its connects; read them once
+        raw_id = getattr(shape, 'ID', _MISSING)
+        conn_id = str(raw_id) if raw_id is not _MISSING else f"conn_{id(shape)}"
+        label = getattr(shape, 'text', "")
+        
+        # Ensure connects is iterable
+        connects_list = connects if hasattr(connects, '__iter__') else []
+        for connect in connects_list:
             try:
-                # Extract basic shape information with safe attribute access
-                shape_data = {
-                    "id": str(shape.ID) if hasattr(shape, 'ID') else f"shape_{id(shape)}",
-                    "name": shape.text if hasattr(shape, 'text') and shape.text else f"Shape_{shape.ID if hasattr(shape, 'ID') else id(shape)}",
-                    "master_name": shape.master_page.name if hasattr(shape, 'master_page') and shape.master_page and hasattr(shape.master_page, 'name') else None,
-                    "x": float(shape.x) if hasattr(shape, 'x') and shape.x is not None else 0.0,
-                    "y": float(shape.y) if hasattr(shape, 'y') and shape.y is not None else 0.0,
-                    "width": float(shape.width) if hasattr(shape, 'width') and shape.width is not None else 0.0,
-                    "height": float(shape.height) if hasattr(shape, 'height') and shape.height is not None else 0.0,
-                    "text": shape.text if hasattr(shape, 'text') else None,
-                }
+                from_rel = getattr(connect, 'from_rel', None)
+                to_rel = getattr(connect, 'to_rel', None)
                 
-                # Detect shape type based on master name and text
-                shape_type = detect_shape_type(
-                    shape_data.get("master_name", ""),
-                    shape_data.get("text", "")
-                )
+                # Extract source ID safely
+                source_id = self._rel_shape_id(from_rel)
                 
-                # Extract additional properties safely
-                properties = {}
-                if hasattr(shape, 'data_properties') and shape.data_properties:
-                    try:
-                        for prop in shape.data_properties:
-                            if hasattr(prop, 'name') and hasattr(prop, 'value'):
-                                prop_name = str(prop.name) if prop.name else 'unknown'
-                                prop_value = str(prop.value) if prop.value is not None else ''
-                                properties[prop_name] = prop_value
-                    except Exception as e:
-                        logger.debug(f"Could not extract data properties: {e}")
+                # Extract target ID safely
+                target_id = self._rel_shape_id(to_rel)
                 
-                # Create NetworkShape instance
-                network_shape = NetworkShape(
-                    id=shape_data["id"],
-                    name=shape_data["name"],
-                    shape_type=shape_type,
-                    x=shape_data["x"],
-                    y=shape_data["y"],
-                    width=shape_data["width"],
-                    height=shape_data["height"],
-                    properties=properties
-                )
+                # Extract connection properties
+                from_part = getattr(from_rel, 'part', None) if from_rel else None
+                to_part = getattr(to_rel, 'part', None) if to_rel else None
                 
-                shapes.append(network_shape)
-                logger.debug(f"Extracted shape: {network_shape.name} (Type: {shape_type.value})")
+                connection = Connection(
+                    id=conn_id,
+                    source_id=source_id,
+                    target_id=target_id,
+                    connection_type="network_link",  # Default type
+                    properties={
+                        "label": label or "",
+                        "from_part": from_part,
+                        "to_part": to_part,
+                    }
+                )
                 
+                if connection.source_id and connection.target_id:
+                    connections.append(connection)
+                    logger.debug("Extracted connection: %s -> %s", connection.source_id, connection.target_id)
+                    
             except Exception as e:
-                shape_id = shape.ID if hasattr(shape, 'ID') else 'unknown'
-                logger.warning(f"Error extracting shape {shape_id}: {type(e).__name__}: {e}")
-                logger.debug(f"Shape details: {vars(shape) if hasattr(shape, '__dict__') else 'No details available'}")
+                shape_id = raw_id if raw_id is not _MISSING else 'unknown'
+                logger.warning(f"Error extracting connection from shape {shape_id}: {type(e).__name__}: {e}")
+                logger.debug("Connection details: from_rel=%s, to_rel=%s",
+                             hasattr(connect, 'from_rel'), hasattr(connect, 'to_rel'))
                 
                 # Log specific error types for better debugging
                 if isinstance(e, TypeError) and "NoneType" in str(e):
-                    logger.error(f"NoneType error in shape {shape_id}: Check data validation")
+                    logger.error(f"NoneType error in connection {shape_id}: Check connection data")
                 elif isinstance(e, AttributeError):
-                    logger.error(f"AttributeError in shape {shape_id}: Missing expected attribute")
+                    logger.error(f"AttributeError in connection {shape_id}: {str(e)}")
                     
                 continue
         
-        return shapes
-    
-    def _extract_connections_vsdx(self, page) -> List[Connection]:
-        """Extract connection information from a VSDX page."""
-        connections = []
-        
-        for shape in page.child_shapes:
-            # Check if shape is a connector
-            if hasattr(shape, 'connects') and shape.connects:
-                # Ensure connects is iterable
-                connects_list = shape.connects if hasattr(shape.connects, '__iter__') else []
-                for connect in connects_list:
-                    try:
-                        # Safely extract connection information
-                        conn_id = str(shape.ID) if hasattr(shape, 'ID') else f"conn_{id(shape)}"
-                        
-                        # Extract source ID safely
-                        source_id = None
-                        if hasattr(connect, 'from_rel') and connect.from_rel:
-                            if hasattr(connect.from_rel, 'shape') and connect.from_rel.shape:
-                                if hasattr(connect.from_rel.shape, 'ID'):
-                                    source_id = str(connect.from_rel.shape.ID)
-                        
-                        # Extract target ID safely
-                        target_id = None
-                        if hasattr(connect, 'to_rel') and connect.to_rel:
-                            if hasattr(connect.to_rel, 'shape') and connect.to_rel.shape:
-                                if hasattr(connect.to_rel.shape, 'ID'):
-                                    target_id = str(connect.to_rel.shape.ID)
-                        
-                        # Extract connection properties
-                        label = shape.text if hasattr(shape, 'text') else ""
-                        from_part = None
-                        to_part = None
-                        
-                        if hasattr(connect, 'from_rel') and connect.from_rel and hasattr(connect.from_rel, 'part'):
-                            from_part = connect.from_rel.part
-                        if hasattr(connect, 'to_rel') and connect.to_rel and hasattr(connect.to_rel, 'part'):
-                            to_part = connect.to_rel.part
-                        
-                        connection = Connection(
-                            id=conn_id,
-                            source_id=source_id,
-                            target_id=target_id,
-                            connection_type="network_link",  # Default type
-                            properties={
-                                "label": label or "",
-                                "from_part": from_part,
-                                "to_part": to_part,
-                            }
-                        )
-                        
-                        if connection.source_id and connection.target_id:
-                            connections.append(connection)
-                            logger.debug(f"Extracted connection: {connection.source_id} -> {connection.target_id}")
-                            
-                    except Exception as e:
-                        shape_id = shape.ID if hasattr(shape, 'ID') else 'unknown'
-                        logger.warning(f"Error extracting connection from shape {shape_id}: {type(e).__name__}: {e}")
-                        logger.debug(f"Connection details: from_rel={hasattr(connect, 'from_rel')}, to_rel={hasattr(connect, 'to_rel')}")
-                        
-                        # Log specific error types for better debugging
-                        if isinstance(e, TypeError) and "NoneType" in str(e):
-                            logger.error(f"NoneType error in connection {shape_id}: Check connection data")
-                        elif isinstance(e, AttributeError):
-                            logger.error(f"AttributeError in connection {shape_id}: {str(e)}")
-                            
-                        continue
-        
         return connections
     
+    @staticmethod
+    def _rel_shape_id(rel) -> Optional[str]:
+        """ID of the shape at one end of a connect, or None if it can't be resolved."""
+        rel_shape = getattr(rel, 'shape', None) if rel else None
+        if not rel_shape:
+            return None
+        rel_id = getattr(rel_shape, 'ID', _MISSING)
+        return str(rel_id) if rel_id is not _MISSING else None
+    
     def _extract_metadata_vsdx(self, vis_file) -> Dict[str, Any]:
         """Extract document metadata from VSDX file."""
         metadata = {
@@ -1,18 +1,46 @@
-from enum import Enum
+import re
+from enum import StrEnum
 from typing import Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 
-class ShapeType(Enum):
-    """Network device shape types."""
+class ShapeType(StrEnum):
+    """Network device shape types (members are their string values, so they serialize as-is)."""
     ROUTER = "router"
     SWITCH = "switch"
     FIREWALL = "firewall"
     SERVER = "server"
     WORKSTATION = "workstation"
     CLOUD = "cloud"
+    STORAGE = "storage"
+    WIRELESS_AP = "wireless_ap"
+    LOAD_BALANCER = "load_balancer"
     UNKNOWN = "unknown"
 
-@dataclass
+# Master-shape keywords per type, in priority order; the first type with a hit wins
+_MASTER_KEYWORDS = {
+    "router": ["router", "rtr"],
+    "switch": ["switch", "sw"],
+    "firewall": ["firewall", "fw"],
+    "server": ["server", "srv"],
+    "workstation": ["workstation", "pc", "computer"],
+    "cloud": ["cloud"],
+    "storage": ["storage", "disk", "nas", "san"],
+    "wireless_ap": ["wireless", "ap", "access point"],
+    "load_balancer": ["load", "balancer", "lb"],
+}
+
+# One anchored lookahead per type: the alternation tries types in priority order,
+# so the earliest-listed type matching anywhere in the name wins, not the leftmost hit
+_MASTER_REGEX = re.compile(
+    r"\A(?:" + "|".join(
+        f"(?=.*?(?P<{group}>{'|'.join(map(re.escape, keywords))}))"
+        for group, keywords in _MASTER_KEYWORDS.items()
+    ) + ")",
+    re.DOTALL,
+)
+_GROUP_TO_TYPE = {group: ShapeType(group) for group in _MASTER_KEYWORDS}
+
+@dataclass(slots=True)
 class NetworkShape:
     """Represents a network device shape from Visio."""
     id: str
@@ -25,10 +53,17 @@ class NetworkShape:
     properties: Dict[str, Any]
     
     def dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for JSON serialization."""
-        data = asdict(self)
-        data['shape_type'] = self.shape_type.value
-        return data
+        """Convert to dictionary for JSON serialization (properties are shared, not copied)."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'shape_type': self.shape_type,
+            'x': self.x,
+            'y': self.y,
+            'width': self.width,
+            'height': self.height,
+            'properties': self.properties,
+        }
     
     @classmethod
     def from_visio_shape(cls, shape_data: Dict[str, Any]) -> "NetworkShape":
@@ -37,34 +72,14 @@ class NetworkShape:
         if not shape_data:
             shape_data = {}
             
-        # Extract shape type from master shape name or text
-        shape_type = ShapeType.UNKNOWN
         master_shape = shape_data.get("master_shape", "")
-        text = shape_data.get("text", "")
         
         # Ensure strings are not None before calling lower()
         master_shape = master_shape.lower() if master_shape else ""
-        text = text.lower() if text else ""
         
-        # Determine shape type based on master shape or text content
-        if any(keyword in master_shape for keyword in ["router", "rtr"]):
-            shape_type = ShapeType.ROUTER
-        elif any(keyword in master_shape for keyword in ["switch", "sw"]):
-            shape_type = ShapeType.SWITCH
-        elif any(keyword in master_shape for keyword in ["firewall", "fw"]):
-            shape_type = ShapeType.FIREWALL
-        elif any(keyword in master_shape for keyword in ["server", "srv"]):
-            shape_type = ShapeType.SERVER
-        elif any(keyword in master_shape for keyword in ["workstation", "pc", "computer"]):
-            shape_type = ShapeType.WORKSTATION
-        elif any(keyword in master_shape for keyword in ["cloud"]):
-            shape_type = ShapeType.CLOUD
-        elif any(keyword in master_shape for keyword in ["storage", "disk", "nas", "san"]):
-            shape_type = ShapeType.STORAGE
-        elif any(keyword in master_shape for keyword in ["wireless", "ap", "access point"]):
-            shape_type = ShapeType.WIRELESS_AP
-        elif any(keyword in master_shape for keyword in ["load", "balancer", "lb"]):
-            shape_type = ShapeType.LOAD_BALANCER
+        # Determine shape type from the master shape name in a single regex pass
+        m = _MASTER_REGEX.match(master_shape)
+        shape_type = _GROUP_TO_TYPE[m.lastgroup] if m else ShapeType.UNKNOWN
         
         # Extract position and size
         bounds = shape_data.get("bounds", {})
@@ -95,7 +110,7 @@ class NetworkShape:
             properties=properties
         )
 
-@dataclass
+@dataclass(slots=True)
 class Connection:
     """Represents a connection between network shapes."""
     id: str
@@ -105,5 +120,11 @@ class Connection:
     properties: Dict[str, Any]
     
     def dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for JSON serialization."""
-        return asdict(self)
\ No newline at end of file
+        """Convert to dictionary for JSON serialization (properties are shared, not copied)."""
+        return {
+            'id': self.id,
+            'source_id': self.source_id,
+            'target_id': self.target_id,
+            'connection_type': self.connection_type,
+            'properties': self.properties,
+        }
\ No newline at end of file
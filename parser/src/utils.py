@@ -1,3 +1,4 @@
+import functools
 import os
 import platform
 import re
@@ -5,6 +6,12 @@ from pathlib import Path
 from typing import Optional
 from .shapes import ShapeType
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
 def get_visio_file_extension() -> str:
     """Get the appropriate Visio file extension for the platform."""
     if platform.system() == "Windows":
@@ -17,13 +24,19 @@ def is_visio_file(file_path: Path) -> bool:
     valid_extensions = {".vsd", ".vsdx", ".vsdm", ".vss", ".vssx", ".vssm"}
     return file_path.suffix.lower() in valid_extensions
 
-def extract_vsdx_contents(file_path: Path, output_dir: Path) -> bool:
+# VSDX package parts needed to parse a diagram: page XML (with rels), masters, document
+_PARSING_PART_PREFIXES = ("visio/pages/", "visio/masters/")
+_PARSING_PART_NAMES = {"visio/document.xml"}
+
+def extract_vsdx_contents(file_path: Path, output_dir: Path, parsing_parts_only: bool = False) -> bool:
     """
     Extract contents of a VSDX file (which is a ZIP archive).
     
     Args:
         file_path: Path to the VSDX file
         output_dir: Directory to extract contents to
+        parsing_parts_only: Only extract the XML parts needed for parsing, skipping
+            embedded images, themes and other media (off by default: full extraction)
         
     Returns:
         True if extraction successful, False otherwise
@@ -32,16 +45,146 @@ def extract_vsdx_contents(file_path: Path, output_dir: Path) -> bool:
     
     try:
         with zipfile.ZipFile(file_path, 'r') as zip_ref:
-            zip_ref.extractall(output_dir)
+            members = None
+            if parsing_parts_only:
+                members = [
+                    name for name in zip_ref.namelist()
+                    if name.startswith(_PARSING_PART_PREFIXES) or name in _PARSING_PART_NAMES
+                ]
+            zip_ref.extractall(output_dir, members=members)
         return True
     except Exception as e:
         print(f"Error extracting VSDX file: {e}")
         return False
 
+# Keyword patterns per device type, checked in order; the first match wins
+_SHAPE_TYPE_PATTERNS = {
+    ShapeType.ROUTER: [
+        r'\brouter\b', r'\brt\b', r'\bcisco.*router', r'\bjuniper.*router',
+        r'\bmikrotik', r'\bedge.*router', r'\bcore.*router', r'\bbgp'
+    ],
+    ShapeType.SWITCH: [
+        r'\bswitch\b', r'\bsw\b', r'\bl2.*switch', r'\bl3.*switch',
+        r'\bmanaged.*switch', r'\bcore.*switch', r'\bdistribution.*switch',
+        r'\baccess.*switch', r'\bcisco.*switch'
+    ],
+    ShapeType.FIREWALL: [
+        r'\bfirewall\b', r'\bfw\b', r'\basa\b', r'\bpalo.*alto',
+        r'\bfortinet', r'\bfortigate', r'\bcheckpoint', r'\bpfsense',
+        r'\bsecurity.*appliance'
+    ],
+    ShapeType.SERVER: [
+        r'\bserver\b', r'\bsrv\b', r'\bhost\b', r'\bvm\b',
+        r'\bwindows.*server', r'\blinux.*server', r'\besxi',
+        r'\bvmware', r'\bhyper-v', r'\bapp.*server', r'\bweb.*server',
+        r'\bdatabase.*server', r'\bfile.*server'
+    ],
+    ShapeType.WORKSTATION: [
+        r'\bworkstation\b', r'\bpc\b', r'\bdesktop\b', r'\blaptop\b',
+        r'\bcomputer\b', r'\bclient\b', r'\buser.*device', r'\bendpoint'
+    ],
+    ShapeType.CLOUD: [
+        r'\bcloud\b', r'\baws\b', r'\bazure\b', r'\bgcp\b',
+        r'\binternet\b', r'\bweb\b', r'\bsaas\b', r'\bpaas',
+        r'\biaas', r'\bpublic.*cloud', r'\bprivate.*cloud'
+    ]
+}
+
+# Common stencil names, checked against the master name before any pattern
+_STENCIL_MAPPING = {
+    'router': ShapeType.ROUTER,
+    'switch': ShapeType.SWITCH,
+    'firewall': ShapeType.FIREWALL,
+    'server': ShapeType.SERVER,
+    'pc': ShapeType.WORKSTATION,
+    'computer': ShapeType.WORKSTATION,
+    'cloud': ShapeType.CLOUD,
+    'internet': ShapeType.CLOUD,
+}
+
+def _build_stencil_matcher():
+    """
+    Aho-Corasick automaton over the stencil names, each tagged with its
+    position in _STENCIL_MAPPING so the earliest-listed hit can be picked,
+    and with its length so the hit can be checked for word boundaries.
+    """
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for priority, (key, shape_type) in enumerate(_STENCIL_MAPPING.items()):
+        automaton.add_word(key, (priority, shape_type, len(key)))
+    automaton.make_automaton()
+    return automaton
+
+_STENCIL_MATCHER = _build_stencil_matcher()
+
+# Fallback when pyahocorasick is missing; \b keeps 'pc' from matching inside 'vpc'
+_STENCIL_REGEX = re.compile(r'\b(?:' + '|'.join(map(re.escape, _STENCIL_MAPPING)) + r')\b')
+_STENCIL_PRIORITY = {key: priority for priority, key in enumerate(_STENCIL_MAPPING)}
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+def _is_whole_word(value: str, start: int, end: int) -> bool:
+    """True if value[start:end] has a word boundary on both sides, as regex \\b would require."""
+    return (
+        (start == 0 or not _is_word_char(value[start - 1]))
+        and (end == len(value) or not _is_word_char(value[end]))
+    )
+
+# Hostname prefix codes (e.g. 'SW-CORE-01'), checked before any pattern
+_PREFIX_MAPPING = {
+    'rt-': ShapeType.ROUTER,
+    'sw-': ShapeType.SWITCH,
+    'fw-': ShapeType.FIREWALL,
+    'srv-': ShapeType.SERVER,
+}
+
+# All patterns compiled into one regex with a named group per type. Each group is an
+# anchored lookahead, so the alternation tries the types in _SHAPE_TYPE_PATTERNS order
+# and the first type matching anywhere wins (a bare alternation would pick the leftmost hit)
+_SHAPE_TYPE_REGEX = re.compile(
+    r"\A(?:" + "|".join(
+        f"(?=[\\s\\S]*?(?P<{shape_type.name}>{'|'.join(f'(?:{pattern})' for pattern in pattern_list)}))"
+        for shape_type, pattern_list in _SHAPE_TYPE_PATTERNS.items()
+    ) + ")"
+)
+
+# Literal keyword each pattern starts with, e.g. 'cisco' for r'\bcisco.*router'
+_LEADING_LITERAL_RE = re.compile(r'\\b([a-z0-9-]+)')
+
+def _build_type_prefilter():
+    """
+    Aho-Corasick automaton over each pattern's leading keyword.
+    
+    A pattern can only match text that contains its leading keyword, so text
+    without any hit cannot match and the regex does not need to run.
+    """
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for pattern_list in _SHAPE_TYPE_PATTERNS.values():
+        for pattern in pattern_list:
+            keyword = _LEADING_LITERAL_RE.match(pattern).group(1)
+            automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+_TYPE_PREFILTER = _build_type_prefilter()
+
+@functools.lru_cache(maxsize=4096)
 def detect_shape_type(master_name: str, text: str) -> ShapeType:
     """
     Detect the type of network device based on shape master name and text.
     
+    A well-known stencil name (a whole word of the master name) decides the type outright,
+    then a hostname prefix code such as 'SW-' or 'FW-' leading the text; otherwise the keyword
+    patterns are matched against master name and text.
+    Results are memoized: diagrams reuse the same stencil masters and labels
+    across many shapes.
+    
     Args:
         master_name: The master shape name from Visio
         text: The text content of the shape
@@ -53,71 +196,74 @@ def detect_shape_type(master_name: str, text: str) -> ShapeType:
     master_name = master_name or ""
     text = text or ""
     
+    # Common stencil names are a cheap, reliable signal; check them first
+    master_lower = master_name.lower()
+    if _STENCIL_MATCHER is not None:
+        # One pass over the name; the earliest-listed stencil name found as a whole word wins
+        hits = [
+            (priority, shape_type)
+            for end, (priority, shape_type, length) in _STENCIL_MATCHER.iter(master_lower)
+            if _is_whole_word(master_lower, end - length + 1, end + 1)
+        ]
+        if hits:
+            return min(hits)[1]
+    else:
+        keys = [m.group() for m in _STENCIL_REGEX.finditer(master_lower)]
+        if keys:
+            return _STENCIL_MAPPING[min(keys, key=_STENCIL_PRIORITY.__getitem__)]
+    
+    # A hostname prefix code in the label names the device type without scanning the whole text
+    head = text.lstrip()[:4].lower()
+    for prefix, shape_type in _PREFIX_MAPPING.items():
+        if head.startswith(prefix):
+            return shape_type
+    
     # Combine master name and text for analysis
     combined = f"{master_name} {text}".lower()
     
-    # Define patterns for each device type
-    patterns = {
-        ShapeType.ROUTER: [
-            r'\brouter\b', r'\brt\b', r'\bcisco.*router', r'\bjuniper.*router',
-            r'\bmikrotik', r'\bedge.*router', r'\bcore.*router', r'\bbgp'
-        ],
-        ShapeType.SWITCH: [
-            r'\bswitch\b', r'\bsw\b', r'\bl2.*switch', r'\bl3.*switch',
-            r'\bmanaged.*switch', r'\bcore.*switch', r'\bdistribution.*switch',
-            r'\baccess.*switch', r'\bcisco.*switch'
-        ],
-        ShapeType.FIREWALL: [
-            r'\bfirewall\b', r'\bfw\b', r'\basa\b', r'\bpalo.*alto',
-            r'\bfortinet', r'\bfortigate', r'\bcheckpoint', r'\bpfsense',
-            r'\bsecurity.*appliance'
-        ],
-        ShapeType.SERVER: [
-            r'\bserver\b', r'\bsrv\b', r'\bhost\b', r'\bvm\b',
-            r'\bwindows.*server', r'\blinux.*server', r'\besxi',
-            r'\bvmware', r'\bhyper-v', r'\bapp.*server', r'\bweb.*server',
-            r'\bdatabase.*server', r'\bfile.*server'
-        ],
-        ShapeType.WORKSTATION: [
-            r'\bworkstation\b', r'\bpc\b', r'\bdesktop\b', r'\blaptop\b',
-            r'\bcomputer\b', r'\bclient\b', r'\buser.*device', r'\bendpoint'
-        ],
-        ShapeType.CLOUD: [
-            r'\bcloud\b', r'\baws\b', r'\bazure\b', r'\bgcp\b',
-            r'\binternet\b', r'\bweb\b', r'\bsaas\b', r'\bpaas',
-            r'\biaas', r'\bpublic.*cloud', r'\bprivate.*cloud'
-        ]
-    }
+    # Skip the regex when none of the keywords occur in the text
+    if _TYPE_PREFILTER is not None and next(_TYPE_PREFILTER.iter(combined), None) is None:
+        return ShapeType.UNKNOWN
     
-    # Check each pattern
-    for shape_type, pattern_list in patterns.items():
-        for pattern in pattern_list:
-            if re.search(pattern, combined):
-                return shape_type
-    
-    # Additional checks based on common stencil names
-    stencil_mapping = {
-        'router': ShapeType.ROUTER,
-        'switch': ShapeType.SWITCH,
-        'firewall': ShapeType.FIREWALL,
-        'server': ShapeType.SERVER,
-        'pc': ShapeType.WORKSTATION,
-        'computer': ShapeType.WORKSTATION,
-        'cloud': ShapeType.CLOUD,
-        'internet': ShapeType.CLOUD,
-    }
-    
-    for key, shape_type in stencil_mapping.items():
-        if key in master_name.lower():
-            return shape_type
+    # One regex pass; the matching group names the type
+    match = _SHAPE_TYPE_REGEX.match(combined)
+    if match:
+        return ShapeType[match.lastgroup]
     
     # Default to UNKNOWN if no match found
     return ShapeType.UNKNOWN
 
+# Connector label keywords per connection type, checked in order; the first match wins
+_CONNECTION_KEYWORDS = {
+    'ethernet': ['ethernet', 'eth', 'gig', 'fast'],
+    'fiber': ['fiber', 'optical', 'sfp'],
+    'serial': ['serial', 'rs232', 'console'],
+    'wireless': ['wireless', 'wifi', 'wi-fi', '802.11'],
+    'vpn': ['vpn', 'tunnel', 'ipsec'],
+    'wan': ['wan', 'mpls', 'leased'],
+}
+
+# One anchored lookahead per connection type, as in _SHAPE_TYPE_REGEX, so list order decides
+_CONNECTION_REGEX = re.compile(
+    r"\A(?:" + "|".join(
+        f"(?=[\\s\\S]*?(?P<{connection_type}>{'|'.join(map(re.escape, keywords))}))"
+        for connection_type, keywords in _CONNECTION_KEYWORDS.items()
+    ) + ")"
+)
+
+# Connection type implied by an endpoint's device type, checked in order
+_ENDPOINT_CONNECTION_TYPES = (
+    (ShapeType.CLOUD, "internet"),
+    (ShapeType.FIREWALL, "security_link"),
+)
+
+@functools.lru_cache(maxsize=4096)
 def normalize_connection_type(connector_text: str, source_type: ShapeType, target_type: ShapeType) -> str:
     """
     Normalize connection type based on connector text and connected device types.
     
+    Results are memoized; ShapeType members are hashable, so they are valid cache keys.
+    
     Args:
         connector_text: Text from the connector shape
         source_type: Type of source device
@@ -126,31 +272,21 @@ def normalize_connection_type(connector_text: str, source_type: ShapeType, targe
     Returns:
         Normalized connection type string
     """
-    # Handle None or empty connector_text
-    if not connector_text:
-        connector_text = ""
-    
-    text_lower = connector_text.lower()
-    
-    # Check for specific connection types
-    if any(term in text_lower for term in ['ethernet', 'eth', 'gig', 'fast']):
-        return "ethernet"
-    elif any(term in text_lower for term in ['fiber', 'optical', 'sfp']):
-        return "fiber"
-    elif any(term in text_lower for term in ['serial', 'rs232', 'console']):
-        return "serial"
-    elif any(term in text_lower for term in ['wireless', 'wifi', 'wi-fi', '802.11']):
-        return "wireless"
-    elif any(term in text_lower for term in ['vpn', 'tunnel', 'ipsec']):
-        return "vpn"
-    elif any(term in text_lower for term in ['wan', 'mpls', 'leased']):
-        return "wan"
+    # Check for specific connection types in one regex pass over the label
+    if connector_text:
+        match = _CONNECTION_REGEX.match(connector_text.lower())
+        if match:
+            return match.lastgroup
     
     # Infer based on device types
-    if source_type == ShapeType.CLOUD or target_type == ShapeType.CLOUD:
-        return "internet"
-    elif source_type == ShapeType.FIREWALL or target_type == ShapeType.FIREWALL:
-        return "security_link"
+    for shape_type, connection_type in _ENDPOINT_CONNECTION_TYPES:
+        if source_type == shape_type or target_type == shape_type:
+            return connection_type
     
     # Default
-    return "network_link"
\ No newline at end of file
+    return "network_link"
+
+def clear_caches() -> None:
+    """Reset the memoized shape and connection type lookups (e.g. between tests)."""
+    detect_shape_type.cache_clear()
+    normalize_connection_type.cache_clear()
@@ -0,0 +1,39 @@
+from collections import namedtuple
+
+import pytest
+
+
+# Lightweight stand-ins for vsdx objects; far cheaper to build and read than a Mock
+FakeShape = namedtuple(
+    "FakeShape", "ID text master_page x y width height data_properties connects"
+)
+FakeMaster = namedtuple("FakeMaster", "name")
+# A connector's connect: each end is a relationship to the shape glued there
+FakeConnect = namedtuple("FakeConnect", "from_rel to_rel")
+FakeRel = namedtuple("FakeRel", "shape")
+
+
+@pytest.fixture
+def fake_shape():
+    """Factory for vsdx-like shapes; name is the shape's master stencil name."""
+    def make(ID, name, text, x=0.0, y=0.0, width=50.0, height=50.0):
+        return FakeShape(
+            ID=ID, text=text, master_page=FakeMaster(name), x=x, y=y,
+            width=width, height=height, data_properties=(), connects=(),
+        )
+    return make
+
+
+@pytest.fixture
+def fake_connector():
+    """Factory for vsdx-like connector shapes glued between source and target (either may be None)."""
+    def make(ID, text, source=None, target=None):
+        connect = FakeConnect(
+            from_rel=FakeRel(source) if source is not None else None,
+            to_rel=FakeRel(target) if target is not None else None,
+        )
+        return FakeShape(
+            ID=ID, text=text, master_page=FakeMaster("Dynamic connector"), x=0.0, y=0.0,
+            width=0.0, height=0.0, data_properties=(), connects=[connect],
+        )
+    return make
@@ -208,14 +208,17 @@ def generate_sample_network_data():
     
     return document_data
 
-def save_test_data():
-    """Save test data to a JSON file."""
+def save_test_data(pretty: bool = False):
+    """Save test data to a JSON file (compact unless pretty is set)."""
     test_data = generate_sample_network_data()
     
     # Save to file
     output_path = Path(__file__).parent / "sample_parsed_data.json"
     with open(output_path, "w") as f:
-        json.dump(test_data, f, indent=2)
+        if pretty:
+            json.dump(test_data, f, indent=2)
+        else:
+            json.dump(test_data, f, separators=(",", ":"))
     
     print(f"Test data saved to: {output_path}")
     print(f"Total shapes: {len(test_data['shapes'])}")
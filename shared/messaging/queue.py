@@ -1,17 +1,39 @@
 import asyncio
 import json
 import logging
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, Any, Optional
 import aio_pika
 from aio_pika import ExchangeType
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+def _encode_message(message: Dict[str, Any]) -> bytes:
+    """Serialize a message body to JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(message)
+    return json.dumps(message).encode()
+
+def _decode_message(body: bytes) -> Dict[str, Any]:
+    """Parse a JSON message body; both decoders read bytes directly, no .decode() copy."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
 class MessageQueue:
     """RabbitMQ message queue wrapper for inter-service communication."""
     
-    def __init__(self, rabbitmq_url: str):
+    def __init__(self, rabbitmq_url: str, prefetch_count: Optional[int] = None,
+                 max_concurrency: Optional[int] = None):
         self.url = rabbitmq_url
+        # Optional bound on unacknowledged deliveries per channel; None leaves QoS unset (no limit)
+        self.prefetch_count = prefetch_count
+        # Optional cap on callbacks running at once, below prefetch_count; extra deliveries wait
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
         self.connection = None
         self.channel = None
         self.exchange = None
@@ -20,6 +42,8 @@ class MessageQueue:
         """Establish connection to RabbitMQ."""
         self.connection = await aio_pika.connect_robust(self.url)
         self.channel = await self.connection.channel()
+        if self.prefetch_count:
+            await self.channel.set_qos(prefetch_count=self.prefetch_count)
         
         # Declare main exchange
         self.exchange = await self.channel.declare_exchange(
@@ -46,14 +70,15 @@ class MessageQueue:
             
         await self.exchange.publish(
             aio_pika.Message(
-                body=json.dumps(message).encode(),
+                body=_encode_message(message),
                 content_type="application/json"
             ),
             routing_key=routing_key
         )
         logger.info(f"Published message to {routing_key}")
     
-    async def consume(self, queue_name: str, routing_key: str, callback: Callable):
+    async def consume(self, queue_name: str, routing_key: str, callback: Callable,
+                      prefetch_count: Optional[int] = None):
         """
         Consume messages from a queue.
         
@@ -61,25 +86,39 @@ class MessageQueue:
             queue_name: Name of the queue
             routing_key: Routing key pattern to bind
             callback: Async callback function to process messages
+            prefetch_count: Max unacknowledged messages delivered at once (callbacks run
+                concurrently); overrides the channel-wide limit, if any, set on connect
         """
         if not self.channel:
             await self.connect()
+        
+        if prefetch_count and prefetch_count != self.prefetch_count:
+            await self.channel.set_qos(prefetch_count=prefetch_count)
             
         # Declare queue
         queue = await self.channel.declare_queue(queue_name, durable=True)
         await queue.bind(self.exchange, routing_key)
         
-        async def process_message(message: aio_pika.IncomingMessage):
-            async with message.process():
+        async def handle_message(message: aio_pika.IncomingMessage):
+            # requeue=False: a failing message is rejected once rather than redelivered in a loop
+            async with message.process(requeue=False, ignore_processed=True):
                 try:
-                    data = json.loads(message.body.decode())
+                    data = _decode_message(message.body)
                     await callback(data)
                 except Exception as e:
                     logger.error(f"Error processing message: {e}")
-                    # Message will be requeued on exception
+                    # Message will be rejected on exception
                     raise
         
-        await queue.consume(process_message)
+        # aio_pika runs each delivery in its own task; the semaphore only bounds how many run at once
+        async def process_message(message: aio_pika.IncomingMessage):
+            if self._semaphore is None:
+                await handle_message(message)
+                return
+            async with self._semaphore:
+                await handle_message(message)
+        
+        await queue.consume(process_message, no_ack=False, exclusive=False)
         logger.info(f"Started consuming from {queue_name} with routing key {routing_key}")
 
 # Message routing keys
@@ -1,41 +1,114 @@
+import asyncio
+import functools
 import logging
 from typing import Optional, BinaryIO
 from pathlib import Path
+from types import MappingProxyType
 import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+import certifi
+import urllib3
 from minio import Minio
 from minio.error import S3Error
 
 logger = logging.getLogger(__name__)
 
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
 class MinioStorage:
     """MinIO object storage client for file management."""
     
-    def __init__(self, endpoint: str, access_key: str, secret_key: str, secure: bool = False):
+    def __init__(self, endpoint: str, access_key: str, secret_key: str, secure: bool = False,
+                 part_size: int = 50 * 1024 * 1024, num_parallel_uploads: int = 4,
+                 download_part_size: int = 16 * 1024 * 1024, num_parallel_downloads: int = 8,
+                 max_pool_connections: int = 32, max_workers: int = 32):
+        self.part_size = part_size
+        self.num_parallel_uploads = num_parallel_uploads
+        self.download_part_size = download_part_size
+        self.num_parallel_downloads = num_parallel_downloads
+        # One pool shared by all calls, sized for the parallel part uploads and range downloads,
+        # so connections (and TLS sessions) are reused instead of opened per request
+        http_client = urllib3.PoolManager(
+            num_pools=10,
+            maxsize=max_pool_connections,
+            block=False,
+            timeout=urllib3.Timeout(connect=5, read=60),
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+            retries=urllib3.Retry(
+                total=3,
+                backoff_factor=0.2,
+                status_forcelist=[500, 502, 503, 504]
+            )
+        )
         self.client = Minio(
             endpoint,
             access_key=access_key,
             secret_key=secret_key,
-            secure=secure
+            secure=secure,
+            http_client=http_client
         )
-        self.buckets = {
+        # The minio SDK is blocking; its calls run here so the event loop stays responsive
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="minio")
+        # Buckets known to exist; checked before any round-trip to the server
+        self._ready_buckets = set()
+        # Fixed at construction; read-only so the name lookup can't go stale
+        self.buckets = MappingProxyType({
             "uploads": "netdocgen-uploads",
             "parsed": "netdocgen-parsed",
             "generated": "netdocgen-generated"
-        }
+        })
         
+    def _bucket_name(self, bucket_type: str) -> str:
+        """Bucket name for a bucket type; raises ValueError for unknown types."""
+        try:
+            return self.buckets[bucket_type]
+        except KeyError:
+            raise ValueError(f"Invalid bucket type: {bucket_type}") from None
+    
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking client call on the storage executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def close(self):
+        """Stop the storage executor; calls already running are left to finish."""
+        self._executor.shutdown(wait=False)
+    
     async def initialize_buckets(self):
         """Create required buckets if they don't exist."""
-        for bucket_name in self.buckets.values():
-            try:
-                if not self.client.bucket_exists(bucket_name):
-                    self.client.make_bucket(bucket_name)
-                    logger.info(f"Created bucket: {bucket_name}")
-            except S3Error as e:
-                logger.error(f"Error creating bucket {bucket_name}: {e}")
-                raise
+        if self._ready_buckets.issuperset(self.buckets.values()):
+            return
+        
+        try:
+            # One listing instead of a HEAD per bucket, then create the missing ones together
+            existing = {bucket.name for bucket in await self._run(self.client.list_buckets)}
+            missing = [name for name in self.buckets.values() if name not in existing]
+            await asyncio.gather(*[self._run(self.client.make_bucket, name) for name in missing])
+            for bucket_name in missing:
+                logger.info(f"Created bucket: {bucket_name}")
+            self._ready_buckets.update(self.buckets.values())
+        except S3Error as e:
+            logger.error(f"Error creating buckets: {e}")
+            raise
+    
+    async def _ensure_bucket(self, bucket_name: str):
+        """Create a bucket if it doesn't exist, checking the server only once per bucket."""
+        if bucket_name in self._ready_buckets:
+            return
+        if not await self._run(self.client.bucket_exists, bucket_name):
+            await self._run(self.client.make_bucket, bucket_name)
+            logger.info(f"Created bucket: {bucket_name}")
+        self._ready_buckets.add(bucket_name)
     
     async def upload_file(self, bucket_type: str, object_name: str, file_data: BinaryIO, 
-                         content_type: str = "application/octet-stream") -> str:
+                         content_type: str = "application/octet-stream",
+                         compress: bool = False) -> str:
         """
         Upload a file to MinIO.
         
@@ -44,26 +117,38 @@ class MinioStorage:
             object_name: Name of the object in the bucket
             file_data: File data as binary stream
             content_type: MIME type of the file
+            compress: Store the data zstd-compressed; download_file decompresses it
             
         Returns:
             Object path in MinIO
         """
-        bucket_name = self.buckets.get(bucket_type)
-        if not bucket_name:
-            raise ValueError(f"Invalid bucket type: {bucket_type}")
+        bucket_name = self._bucket_name(bucket_type)
+        
+        metadata = None
+        if compress:
+            if ZSTD_AVAILABLE:
+                # Compressing a large document is CPU-bound; keep it off the event loop
+                file_data = io.BytesIO(await self._run(self._compress, file_data))
+                metadata = {"compression": "zstd"}
+            else:
+                logger.warning(f"zstandard not available, uploading {object_name} uncompressed")
         
         try:
-            # Get file size
-            file_data.seek(0, 2)
-            file_size = file_data.tell()
-            file_data.seek(0)
+            await self._ensure_bucket(bucket_name)
             
-            self.client.put_object(
+            # Length -1: the client reads the stream one part at a time, sends a single PUT
+            # if the first part is all there is, and otherwise switches to a multipart upload
+            # with parts sent in parallel. No size probe, so unseekable streams work too.
+            await self._run(
+                self.client.put_object,
                 bucket_name,
                 object_name,
                 file_data,
-                file_size,
-                content_type=content_type
+                -1,
+                content_type=content_type,
+                metadata=metadata,
+                part_size=self.part_size,
+                num_parallel_uploads=self.num_parallel_uploads
             )
             logger.info(f"Uploaded {object_name} to {bucket_name}")
             return f"{bucket_name}/{object_name}"
@@ -71,10 +156,50 @@ class MinioStorage:
             logger.error(f"Error uploading file: {e}")
             raise
     
+    async def upload_path(self, bucket_type: str, object_name: str, path: Path,
+                          content_type: str = "application/octet-stream") -> str:
+        """
+        Upload a local file to MinIO straight from disk.
+        
+        The client reads the file itself (multipart for files larger than part_size),
+        so callers don't have to load it into a BinaryIO first.
+        
+        Args:
+            bucket_type: Type of bucket (uploads, parsed, generated)
+            object_name: Name of the object in the bucket
+            path: Path of the local file
+            content_type: MIME type of the file
+            
+        Returns:
+            Object path in MinIO
+        """
+        bucket_name = self._bucket_name(bucket_type)
+        
+        try:
+            await self._ensure_bucket(bucket_name)
+            await self._run(
+                self.client.fput_object,
+                bucket_name,
+                object_name,
+                str(path),
+                content_type=content_type,
+                part_size=self.part_size,
+                num_parallel_uploads=self.num_parallel_uploads
+            )
+            logger.info(f"Uploaded {path} as {object_name} to {bucket_name}")
+            return f"{bucket_name}/{object_name}"
+        except S3Error as e:
+            logger.error(f"Error uploading file: {e}")
+            raise
+    
     async def download_file(self, bucket_type: str, object_name: str) -> bytes:
         """
         Download a file from MinIO.
         
+        Objects larger than download_part_size are fetched as concurrent byte-range
+        GETs (at most num_parallel_downloads at a time) and joined in order.
+        Objects uploaded with compress=True are decompressed transparently.
+        
         Args:
             bucket_type: Type of bucket
             object_name: Name of the object
@@ -82,28 +207,94 @@ class MinioStorage:
         Returns:
             File content as bytes
         """
-        bucket_name = self.buckets.get(bucket_type)
-        if not bucket_name:
-            raise ValueError(f"Invalid bucket type: {bucket_type}")
+        bucket_name = self._bucket_name(bucket_type)
         
         try:
-            response = self.client.get_object(bucket_name, object_name)
-            data = response.read()
-            response.close()
-            response.release_conn()
-            return data
+            stat = await self._run(self.client.stat_object, bucket_name, object_name)
+            size = stat.size
+            compression = stat.metadata.get("x-amz-meta-compression")
+            if compression == "zstd" and not ZSTD_AVAILABLE:
+                raise RuntimeError(f"{object_name} is zstd-compressed but zstandard is not installed")
+            
+            # Every read must see the object that was stat'ed; an overwrite in between
+            # fails the read with 412 instead of mixing bytes or metadata of two versions
+            etag = stat.etag
+            
+            if size <= self.download_part_size:
+                data = await self._run(self._read_range, bucket_name, object_name, 0, 0, etag)
+                return await self._run(self._decompress, data, compression)
+            
+            semaphore = asyncio.Semaphore(self.num_parallel_downloads)
+            
+            async def fetch(offset: int) -> bytes:
+                async with semaphore:
+                    length = min(self.download_part_size, size - offset)
+                    return await self._run(self._read_range, bucket_name, object_name, offset, length, etag)
+            
+            parts = await asyncio.gather(*[
+                fetch(offset) for offset in range(0, size, self.download_part_size)
+            ])
+            return await self._run(self._decompress, b"".join(parts), compression)
+        except S3Error as e:
+            logger.error(f"Error downloading file: {e}")
+            raise
+    
+    async def download_to(self, bucket_type: str, object_name: str, path: Path) -> Path:
+        """
+        Download a file from MinIO straight to a local path.
+        
+        The client streams the object to disk in chunks, so it is never held in
+        memory as a whole. Compressed objects are written as stored.
+        
+        Args:
+            bucket_type: Type of bucket
+            object_name: Name of the object
+            path: Local path to write to
+            
+        Returns:
+            The path written
+        """
+        bucket_name = self._bucket_name(bucket_type)
+        
+        try:
+            await self._run(self.client.fget_object, bucket_name, object_name, str(path))
+            logger.info(f"Downloaded {object_name} from {bucket_name} to {path}")
+            return path
         except S3Error as e:
             logger.error(f"Error downloading file: {e}")
             raise
     
+    @staticmethod
+    def _compress(file_data: BinaryIO) -> bytes:
+        """Read the stream and zstd-compress it."""
+        return zstandard.ZstdCompressor(level=3).compress(file_data.read())
+    
+    @staticmethod
+    def _decompress(data: bytes, compression: Optional[str]) -> bytes:
+        """Undo the compression recorded in the object's metadata, if any."""
+        if compression == "zstd":
+            return zstandard.ZstdDecompressor().decompress(data)
+        return data
+    
+    def _read_range(self, bucket_name: str, object_name: str, offset: int, length: int,
+                    etag: Optional[str] = None) -> bytes:
+        """Read length bytes of an object from offset (length 0 reads to the end), optionally pinned to an ETag."""
+        response = self.client.get_object(
+            bucket_name, object_name, offset=offset, length=length,
+            request_headers={"If-Match": etag} if etag else None
+        )
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+    
     async def delete_file(self, bucket_type: str, object_name: str):
         """Delete a file from MinIO."""
-        bucket_name = self.buckets.get(bucket_type)
-        if not bucket_name:
-            raise ValueError(f"Invalid bucket type: {bucket_type}")
+        bucket_name = self._bucket_name(bucket_type)
         
         try:
-            self.client.remove_object(bucket_name, object_name)
+            await self._run(self.client.remove_object, bucket_name, object_name)
             logger.info(f"Deleted {object_name} from {bucket_name}")
         except S3Error as e:
             logger.error(f"Error deleting file: {e}")
@@ -15,6 +15,11 @@ from datetime import datetime
 # Add directories to path
 sys.path.append(str(Path(__file__)))
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -146,12 +151,39 @@ async def test_integration():
         parsed_data_path = f"parsed/{document_id}/parsed_data.json"
         
         from io import BytesIO
-        parsed_json = json.dumps(SAMPLE_PARSED_DATA, indent=2)
-        await storage.upload_file(
-            bucket_type="parsed",
-            object_name=f"{document_id}/parsed_data.json",
-            file_data=BytesIO(parsed_json.encode()),
-            content_type="application/json"
+        # Compact JSON bytes, as the parser writes them (orjson encodes straight to bytes)
+        if orjson is not None:
+            parsed_json = orjson.dumps(SAMPLE_PARSED_DATA)
+        else:
+            parsed_json = json.dumps(SAMPLE_PARSED_DATA, separators=(",", ":")).encode()
+        
+        completions = asyncio.Queue()
+        
+        async def handle_completion(message):
+            await completions.put(message)
+        
+        async def wait_for_completion():
+            # Skip completions left over from other runs on the shared queue
+            while True:
+                message = await completions.get()
+                if message.get("document_id") == document_id:
+                    return message
+        
+        # Subscribe to completion messages while the upload is in flight; both must be done
+        # before the generation request goes out, so the generator finds the parsed data and
+        # its completion can't arrive before anyone is listening
+        await asyncio.gather(
+            storage.upload_file(
+                bucket_type="parsed",
+                object_name=f"{document_id}/parsed_data.json",
+                file_data=BytesIO(parsed_json),
+                content_type="application/json"
+            ),
+            mq.consume(
+                queue_name="test_completion_queue",
+                routing_key=RoutingKeys.GENERATE_COMPLETE,
+                callback=handle_completion
+            )
         )
         print(f"   ✓ Uploaded to: {parsed_data_path}")
         
@@ -175,24 +207,9 @@ async def test_integration():
         print("\n5. Waiting for generation completion...")
         print("   (Make sure the generator service is running!)")
         
-        completion_received = asyncio.Event()
-        completion_message = None
-        
-        async def handle_completion(message):
-            nonlocal completion_message
-            completion_message = message
-            completion_received.set()
-        
-        # Subscribe to completion messages
-        await mq.consume(
-            queue_name="test_completion_queue",
-            routing_key=RoutingKeys.GENERATE_COMPLETE,
-            callback=handle_completion
-        )
-        
         # Wait for completion (timeout after 30 seconds)
         try:
-            await asyncio.wait_for(completion_received.wait(), timeout=30.0)
+            completion_message = await asyncio.wait_for(wait_for_completion(), timeout=30.0)
             
             if completion_message:
                 print("\n   ✓ Generation completed!")